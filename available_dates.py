@@ -0,0 +1,103 @@
+"""Incremental tracking of the available dates returned by the consulate days endpoint.
+
+The raw payload of each answer is hashed first: an answer identical to the previous one is not
+decoded again. Otherwise the dates are compared with the previous answer, so only the changes
+are logged.
+
+A date stays a booking candidate from the check it appears in until it is tried, even if it was
+not the best one of that check.
+"""
+
+import hashlib
+import json
+from typing import NamedTuple
+
+
+class DatesUpdate(NamedTuple):
+    """Result of one availability check."""
+
+    # Every available date, sorted (ISO format)
+    dates: list[str]
+    # Dates not available in the previous check, sorted
+    added: list[str]
+    # Dates of the previous check that are not available anymore, sorted
+    removed: list[str]
+
+
+class AvailableDates:
+    """Keep the last answer of the days endpoint and diff the new ones against it."""
+
+    def __init__(self) -> None:
+        """Start without a previous answer: the first dates are all new."""
+        self.dates = []
+        self._date_set = frozenset()
+        self._digest = None
+        # Available dates whose booking was already attempted
+        self._tried = set()
+        # Tried dates to offer again from the next check
+        self._retry = set()
+
+    def update(self, payload: bytes | str) -> DatesUpdate:
+        """Compare an answer of the days endpoint with the previous one.
+
+        An empty list is returned as is without replacing the previous answer: it means a ban,
+        not that every date was taken.
+
+        Args:
+            payload (bytes | str): The raw JSON answer, a list of {"date": "YYYY-MM-DD", ...}.
+
+        Returns:
+            DatesUpdate: The current dates and the changes since the previous answer.
+
+        Raises:
+            ValueError: If the payload is not valid JSON.
+
+        """
+        self._tried -= self._retry
+        self._retry.clear()
+        if isinstance(payload, str):
+            payload = payload.encode()
+        digest = hashlib.blake2b(payload, digest_size=16).digest()
+        if digest == self._digest:
+            return DatesUpdate(dates=self.dates, added=[], removed=[])
+
+        dates = sorted({d["date"] for d in json.loads(payload)})
+        if not dates:
+            return DatesUpdate(dates=[], added=[], removed=[])
+
+        date_set = frozenset(dates)
+        added = sorted(date_set - self._date_set)
+        removed = sorted(self._date_set - date_set)
+        self.dates, self._date_set, self._digest = dates, date_set, digest
+        # A date taken and released again is a new candidate
+        self._tried &= date_set
+        return DatesUpdate(dates=dates, added=added, removed=removed)
+
+    def untried(self) -> list[str]:
+        """Return the available dates whose booking was not attempted yet.
+
+        Returns:
+            list[str]: The dates, sorted.
+
+        """
+        return [d for d in self.dates if d not in self._tried]
+
+    def mark_tried(self, date: str) -> None:
+        """Stop offering a date as a booking candidate while it stays available.
+
+        Args:
+            date (str): The date (YYYY-MM-DD).
+
+        """
+        self._tried.add(date)
+
+    def forget(self, date: str) -> None:
+        """Offer a date again from the next check, for example after a failed booking.
+
+        Until then it is not offered: the last answer may be stale.
+
+        Args:
+            date (str): The date (YYYY-MM-DD).
+
+        """
+        self._retry.add(date)
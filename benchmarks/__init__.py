@@ -0,0 +1 @@
+"""Benchmarks for the polling and booking paths of visa.py."""
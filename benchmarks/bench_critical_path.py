@@ -0,0 +1,256 @@
+"""Benchmark each step of the poll -> detect -> book critical path of visa.py.
+
+Measured pieces:
+- get_consulate_appointment_date: poll of the consulate days endpoint (unchanged answer)
+- get_available_slot: search of the best date inside the target period
+- rank_times: choice of the consulate time
+- get_cas_date / get_cas_time: CAS lookups for the chosen consulate slot
+- reschedule_post: construction of the reschedule POST data
+- critical_path: all of the above in a row, as done when a slot is freed
+
+Backends:
+- fixture: JSON responses recorded in benchmarks/fixtures (no network, no server latency)
+- server: the local mock server, over the HTTP polling session
+
+The JSON report can be saved with --output and compared with a previous one with --compare:
+
+    python benchmarks/bench_critical_path.py --output before.json
+    python benchmarks/bench_critical_path.py --compare before.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import re
+import subprocess
+import time
+from collections.abc import Callable
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlencode
+
+from common import REPO_ROOT, load_visa, summarize
+from mock_server import start_server
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+ENDPOINT = re.compile(r"/appointment/(days|times)/(\d+)\.json")
+# Slower by more than this ratio is flagged as a regression by --compare
+REGRESSION_RATIO = 1.1
+
+
+def fixture_name(url: str, facility_id: int) -> str:
+    """Return the fixture file name that answers a JSON endpoint URL.
+
+    Args:
+        url (str): URL of the days/times endpoint.
+        facility_id (int): The consulate FACILITY_ID (any other id is the CAS facility).
+
+    Returns:
+        str: File name inside FIXTURES_DIR.
+
+    """
+    kind, facility = ENDPOINT.search(url).groups()
+    prefix = "" if int(facility) == facility_id else "cas_"
+    return f"{prefix}{kind}.json"
+
+
+def use_fixture_backend(visa: object) -> None:
+    """Answer visa.fetch_raw() with the recorded fixtures.
+
+    Args:
+        visa (object): The imported visa module.
+
+    """
+    fixtures = {path.name: path.read_bytes() for path in FIXTURES_DIR.glob("*.json")}
+    visa.fetch_raw = lambda url: fixtures[fixture_name(url, visa.FACILITY_ID)]
+
+
+def record_fixtures(visa: object) -> None:
+    """Save the answers of the server backend as the fixtures of the fixture backend.
+
+    Args:
+        visa (object): The imported visa module, already using the server backend.
+
+    """
+    dates = visa.fetch_json(visa.DATE_URL)
+    date = dates[-1]["date"]
+    responses = {
+        "days.json": dates,
+        "times.json": visa.fetch_json(visa.TIME_URL % date),
+        "cas_days.json": visa.fetch_json(visa.CAS_DATE_URL % (date, "10:30")),
+    }
+    cas_date = responses["cas_days.json"][-1]["date"]
+    responses["cas_times.json"] = visa.fetch_json(visa.CAS_TIME_URL % (cas_date, date, "10:30"))
+
+    FIXTURES_DIR.mkdir(exist_ok=True)
+    for name, payload in responses.items():
+        (FIXTURES_DIR / name).write_text(json.dumps(payload, indent=1) + "\n")
+    print(f"Fixtures saved in {FIXTURES_DIR}")
+
+
+def measure(func: Callable, repeat: int, warmup: int = 3) -> dict:
+    """Time repeated calls of a function with its output silenced.
+
+    Args:
+        func (Callable): Function without arguments to measure.
+        repeat (int): Number of measured calls.
+        warmup (int): Number of calls run before measuring.
+
+    Returns:
+        dict: The latency summary of the measured calls.
+
+    """
+    samples = []
+    with Path(os.devnull).open("w") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(warmup):
+            func()
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def run_benchmarks(visa: object, repeat: int) -> dict:
+    """Measure every piece of the critical path and the whole path.
+
+    Args:
+        visa (object): The imported visa module with a backend in place.
+        repeat (int): Number of measured calls per piece.
+
+    Returns:
+        dict: Latency summary by piece.
+
+    """
+    facility = visa.FACILITIES[0]
+    dates = visa.get_consulate_appointment_date().dates
+    # The target period only covers the last date, so the whole list is scanned
+    date = dates[-1]
+    window = type(visa.SETTINGS.date_window)([(date, date)])
+    visa.SETTINGS = visa.SETTINGS._replace(date_window=window)
+    times = visa.fetch_json(visa.TIME_URL % date)["available_times"]
+    consulate_time = visa.SETTINGS.slot_ranker.rank_options(visa.Slot(date), "time", times)[0]
+    cas_date = visa.get_cas_date(date, consulate_time)
+    cas_time = visa.get_cas_time(date, consulate_time, cas_date)
+    form = dict.fromkeys(visa.APPOINTMENT_FORM_FIELDS, "benchmark")
+
+    def reschedule_post() -> str:
+        data = visa.build_reschedule_data(form, date, consulate_time, cas_date, cas_time)
+        return urlencode(data, doseq=True)
+
+    def critical_path() -> str:
+        # Nothing was seen before, as when the slot is freed, so the answer is decoded
+        visa.AVAILABLE_DATES[facility] = visa.AvailableDates()
+        visa.get_consulate_appointment_date()
+        untried = visa.AVAILABLE_DATES[facility].untried()
+        found = visa.get_available_slot({facility: untried}).date
+        found_time = visa.get_consulate_appointment_times(found)[0]
+        found_cas_date = visa.get_cas_date(found, found_time)
+        found_cas_time = visa.get_cas_time(found, found_time, found_cas_date)
+        data = visa.build_reschedule_data(form, found, found_time, found_cas_date, found_cas_time)
+        return urlencode(data, doseq=True)
+
+    pieces = {
+        "get_consulate_appointment_date": visa.get_consulate_appointment_date,
+        "get_available_slot": lambda: visa.get_available_slot({facility: dates}),
+        "rank_times": lambda: visa.SETTINGS.slot_ranker.rank_options(
+            visa.Slot(date),
+            "time",
+            times,
+        ),
+        "get_cas_date": lambda: visa.get_cas_date(date, consulate_time),
+        "get_cas_time": lambda: visa.get_cas_time(date, consulate_time, cas_date),
+        "reschedule_post": reschedule_post,
+        "critical_path": critical_path,
+    }
+    return {name: measure(func, repeat) for name, func in pieces.items()}
+
+
+def compare(report: dict, baseline: dict) -> None:
+    """Print the mean latency ratio of each piece against a previous report.
+
+    Args:
+        report (dict): The current report.
+        baseline (dict): A report saved with --output.
+
+    """
+    print(f"\nCompared with {baseline['meta'].get('commit')} (ratio = now / before):")
+    for name, result in report["results"].items():
+        before = baseline["results"].get(name)
+        if not before:
+            continue
+        ratio = result["mean_ms"] / before["mean_ms"] if before["mean_ms"] else float("inf")
+        flag = "  <-- slower" if ratio > REGRESSION_RATIO else ""
+        print(
+            f"  {name:32} {before['mean_ms']:10.4f} ms -> "
+            f"{result['mean_ms']:10.4f} ms  x{ratio:.2f}{flag}",
+        )
+
+
+def current_commit() -> str:
+    """Return the short hash of the checked out commit, or "unknown" outside git."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],  # noqa: S607
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main() -> None:
+    """Run the benchmark suite and print or save its JSON report."""
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--backend", choices=["fixture", "server"], default="fixture")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0, help="Server latency (seconds)")
+    parser.add_argument("--output", type=Path, help="Save the JSON report to this file")
+    parser.add_argument("--compare", type=Path, help="Report to compare the results with")
+    parser.add_argument("--record", action="store_true", help="Refresh the fixtures and exit")
+    args = parser.parse_args()
+    output = args.output.resolve() if args.output else None
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+
+    server = start_server(latency=args.latency, slots=150, seed=1)
+    visa = load_visa(server.base_url)
+    if args.backend == "server" or args.record:
+        visa.HTTP_POLLING = True
+        visa.HTTP_SESSION = visa.requests.Session()
+        visa.HTTP_SESSION.cookies.set("_yatri_session", server.ais.create_session())
+    else:
+        use_fixture_backend(visa)
+
+    if args.record:
+        record_fixtures(visa)
+        return
+
+    report = {
+        "meta": {
+            "commit": current_commit(),
+            "backend": args.backend,
+            "repeat": args.repeat,
+            "server_latency_s": args.latency if args.backend == "server" else None,
+            "python": platform.python_version(),
+            "date": datetime.now().isoformat(timespec="seconds"),
+        },
+        "results": run_benchmarks(visa, args.repeat),
+    }
+    server.shutdown()
+
+    print(json.dumps(report, indent=4))
+    if output:
+        output.write_text(json.dumps(report, indent=4) + "\n")
+    if baseline:
+        compare(report, baseline)
+
+
+if __name__ == "__main__":
+    main()
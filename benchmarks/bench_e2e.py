@@ -0,0 +1,93 @@
+"""Drive the whole start_visa_process loop against the local mock server and time it.
+
+The mock starts with no slot inside the target period. After --release-after seconds one
+slot is opened and the bot has to detect and book it. The report has the login time, the number
+of polls, and the time from the slot release to the successful booking.
+
+Needs Google Chrome (headless) but no network access.
+
+Usage:
+    python benchmarks/bench_e2e.py --latency 0.05 --release-after 5
+"""
+
+import argparse
+import json
+import threading
+import time
+
+from common import load_visa, start_headless_chrome
+from mock_server import start_server
+
+
+def main() -> None:
+    """Run the end-to-end benchmark and print a JSON report."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0, help="Server latency (seconds)")
+    parser.add_argument("--churn", type=float, default=0.1)
+    parser.add_argument("--release-after", type=float, default=5, help="Seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    server = start_server(latency=args.latency, churn=args.churn, seed=args.seed)
+    ais = server.ais
+    target_date = ais.days[-1]
+    ais.slots.discard(target_date)
+    ais.days.remove(target_date)  # Churn must not open it before the release
+
+    visa = load_visa(
+        server.base_url,
+        {
+            "PERSONAL_INFO": {"PRIOD_START": target_date, "PRIOD_END": target_date},
+            "TIME": {"RETRY_TIME_L_BOUND": "0", "RETRY_TIME_U_BOUND": "1"},
+        },
+    )
+    # Spoken alerts need network access and speakers, neither of which exists in CI
+    visa.str_to_google_voice = lambda _message: None
+
+    visa.DRIVER = start_headless_chrome()
+    if visa.DRIVER is None:
+        return
+
+    events = {}
+    original_login = visa.start_login_process
+    original_reschedule = visa.reschedule
+
+    def timed_login() -> bool:
+        start = time.perf_counter()
+        result = original_login()
+        events.setdefault("login_s", time.perf_counter() - start)
+        return result
+
+    def timed_reschedule(*args: object) -> bool:
+        events.setdefault("detected_at", time.perf_counter())
+        return original_reschedule(*args)
+
+    def release_slot() -> None:
+        events["released_at"] = time.perf_counter()
+        ais.open_slot(target_date)
+
+    visa.start_login_process = timed_login
+    visa.reschedule = timed_reschedule
+    threading.Timer(args.release_after, release_slot).start()
+
+    start = time.perf_counter()
+    visa.start_visa_process()
+    booked_at = time.perf_counter()
+    visa.DRIVER.quit()
+    server.shutdown()
+
+    report = {
+        "booked": ais.stats["bookings"] == 1,
+        "login_s": round(events.get("login_s", 0), 3),
+        "polls": ais.stats["polls"],
+        "requests": ais.stats["requests"],
+        "total_s": round(booked_at - start, 3),
+    }
+    if "released_at" in events and "detected_at" in events:
+        report["release_to_detection_s"] = round(events["detected_at"] - events["released_at"], 3)
+        report["detection_to_booking_s"] = round(booked_at - events["detected_at"], 3)
+    print(json.dumps(report, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Compare the latency of one availability poll through Chrome and over plain HTTP.
+
+Both paths poll DATE_URL on a local mock server:
+- browser: the JS_SCRIPT XMLHttpRequest sent through DRIVER.execute_script
+- http: the pooled requests.Session filled by visa.sync_http_session()
+
+Usage:
+    python benchmarks/bench_polling.py --polls 200 --latency 0.02
+"""
+
+import argparse
+import json
+import time
+
+from common import load_visa, start_headless_chrome, summarize
+from mock_server import start_server
+
+
+def time_polls(visa: object, polls: int) -> list[float]:
+    """Time `polls` consecutive calls to visa.get_consulate_appointment_date().
+
+    Args:
+        visa (object): The imported visa module.
+        polls (int): Number of polls to run.
+
+    Returns:
+        list[float]: Duration of each poll in seconds.
+
+    """
+    samples = []
+    for _ in range(polls):
+        start = time.perf_counter()
+        update = visa.get_consulate_appointment_date()
+        if not update or not update.dates:
+            msg = "The mock server returned no dates"
+            raise RuntimeError(msg)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main() -> None:
+    """Run the benchmark and print a JSON report."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--polls", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0, help="Server latency (seconds)")
+    args = parser.parse_args()
+
+    server = start_server(latency=args.latency)
+    visa = load_visa(server.base_url)
+    report = {"polls": args.polls, "server_latency_s": args.latency}
+
+    visa.DRIVER = start_headless_chrome()
+    # Both paths share a session registered directly in the mock, as if the login had run
+    cookie = server.ais.create_session()
+    if visa.DRIVER is None:
+        # Without Chrome only the HTTP path can be measured
+        visa.HTTP_SESSION = visa.requests.Session()
+        visa.HTTP_SESSION.cookies.set("_yatri_session", cookie)
+    else:
+        visa.DRIVER.get(server.base_url)
+        visa.DRIVER.add_cookie({"name": "_yatri_session", "value": cookie})
+        visa.HTTP_POLLING = False
+        report["browser"] = summarize(time_polls(visa, args.polls))
+        visa.HTTP_POLLING = True
+        visa.sync_http_session()
+
+    report["http"] = summarize(time_polls(visa, args.polls))
+    if "browser" in report:
+        report["speedup"] = round(report["browser"]["mean_ms"] / report["http"]["mean_ms"], 2)
+
+    print(json.dumps(report, indent=4))
+    if visa.DRIVER is not None:
+        visa.DRIVER.quit()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
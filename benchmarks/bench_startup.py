@@ -0,0 +1,167 @@
+"""Measure the cold start of visa.py: a new interpreter importing it with `-X importtime`.
+
+Each run starts a fresh Python process that imports visa (which loads and validates its
+configuration) and reports:
+- wall_ms: duration of the whole process, minus the one of an interpreter that imports nothing
+- import_ms: cumulative import time of visa as measured by -X importtime
+- slowest: the modules imported directly by visa that took longest (median over the runs)
+- eager_optional: the heavy optional dependencies that were imported at startup. They should
+  only be imported when their feature is first used, so this list should be empty
+
+The first run of each command is discarded, so compiling the .pyc files is not measured.
+
+Usage:
+    python benchmarks/bench_startup.py --repeat 10 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from common import REPO_ROOT, make_workdir, summarize
+
+# Dependencies that visa.py must not import at startup
+OPTIONAL_MODULES = (
+    "selenium.webdriver",
+    "gtts",
+    "playsound",
+    "sendgrid",
+    "webdriver_manager",
+    "psutil",
+)
+# import time: <self us> | <cumulative us> | <indentation by depth><module>
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)")
+
+
+def run_python(code: str, workdir: Path, *, importtime: bool = False) -> tuple[float, str]:
+    """Run Python code in a new interpreter that can import the repository modules.
+
+    Args:
+        code (str): The code, passed with -c.
+        workdir (Path): Working directory of the process.
+        importtime (bool): Pass -X importtime.
+
+    Returns:
+        tuple[float, str]: The duration of the process in seconds and its stderr.
+
+    Raises:
+        RuntimeError: If the process fails.
+
+    """
+    command = [sys.executable, *(["-X", "importtime"] if importtime else []), "-c", code]
+    env = {**os.environ, "PYTHONPATH": str(REPO_ROOT)}
+    start = time.perf_counter()
+    result = subprocess.run(  # noqa: S603
+        command,
+        cwd=workdir,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    elapsed = time.perf_counter() - start
+    if result.returncode:
+        msg = f"{code!r} failed:\n{result.stderr[-2000:]}"
+        raise RuntimeError(msg)
+    return elapsed, result.stderr
+
+
+def parse_importtime(stderr: str, module: str) -> tuple[float, dict[str, float], set[str]]:
+    """Extract the import times of a module from the output of -X importtime.
+
+    Args:
+        stderr (str): The output.
+        module (str): The top-level module imported by the process, e.g. "visa".
+
+    Returns:
+        tuple[float, dict[str, float], set[str]]: The cumulative import time of the module
+            (seconds), the cumulative time of each module it imports directly (seconds) and the
+            name of every module imported.
+
+    """
+    total = 0.0
+    children = {}
+    pending = {}
+    imported = set()
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match is None:
+            continue
+        _, cumulative, indent, name = match.groups()
+        imported.add(name)
+        # Lines are printed when each import finishes: the direct imports of a top-level module
+        # (depth 1) come right before it
+        depth = (len(indent) - 1) // 2
+        if depth == 1:
+            pending[name] = int(cumulative) / 1e6
+        elif depth == 0:
+            if name == module:
+                total = int(cumulative) / 1e6
+                children = pending
+            pending = {}
+    return total, children, imported
+
+
+def main() -> None:
+    """Run the benchmark and print or save its JSON report."""
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to report")
+    parser.add_argument("--output", type=Path, help="Save the JSON report to this file")
+    args = parser.parse_args()
+
+    workdir = make_workdir("https://ais.usvisa-info.com")
+    # Warm up: compile the .pyc files and the file system caches
+    run_python("pass", workdir)
+    run_python("import visa", workdir)
+
+    baseline, wall, imports = [], [], []
+    children = {}
+    imported = set()
+    for _ in range(args.repeat):
+        baseline.append(run_python("pass", workdir)[0])
+        elapsed, stderr = run_python("import visa", workdir, importtime=True)
+        wall.append(elapsed)
+        total, direct, names = parse_importtime(stderr, "visa")
+        imports.append(total)
+        imported |= names
+        for name, seconds in direct.items():
+            children.setdefault(name, []).append(seconds)
+
+    interpreter = statistics.median(baseline)
+    slowest = sorted(children.items(), key=lambda item: statistics.median(item[1]), reverse=True)
+    report = {
+        "repeat": args.repeat,
+        "python": sys.version.split()[0],
+        "interpreter_ms": round(interpreter * 1000, 2),
+        "wall_ms": summarize([max(0.0, w - interpreter) for w in wall]),
+        "import_ms": summarize(imports),
+        "slowest": {
+            name: round(statistics.median(samples) * 1000, 2)
+            for name, samples in slowest[: args.top]
+        },
+        "eager_optional": sorted(
+            m
+            for m in OPTIONAL_MODULES
+            if m in imported or any(n.startswith(f"{m}.") for n in imported)
+        ),
+    }
+
+    print(json.dumps(report, indent=4))
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=4) + "\n")
+    if report["eager_optional"]:
+        print(f"\nImported at startup: {', '.join(report['eager_optional'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Helpers shared by the benchmark scripts."""
+
+import configparser
+import importlib
+import os
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+from types import ModuleType
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def make_workdir(base_url: str, overrides: dict[str, dict[str, str]] | None = None) -> Path:
+    """Create a throwaway working directory with a config.ini whose BASE_URL points to base_url.
+
+    visa.py reads config.ini (and writes its logs) relative to the working directory.
+
+    Args:
+        base_url (str): Root URL of the server that replaces ais.usvisa-info.com.
+        overrides (dict[str, dict[str, str]] | None): Values replacing the ones of
+            config.ini.example, by section and key.
+
+    Returns:
+        Path: The working directory.
+
+    """
+    config = configparser.ConfigParser()
+    config.read(REPO_ROOT / "config.ini.example")
+    config["PERSONAL_INFO"]["BASE_URL"] = base_url
+    for section, values in (overrides or {}).items():
+        config[section].update(values)
+
+    workdir = Path(tempfile.mkdtemp(prefix="visa_bench_"))
+    with (workdir / "config.ini").open("w") as file:
+        config.write(file)
+    return workdir
+
+
+def load_visa(base_url: str, overrides: dict[str, dict[str, str]] | None = None) -> ModuleType:
+    """Import visa.py with a throwaway config.ini whose BASE_URL points to base_url.
+
+    Args:
+        base_url (str): Root URL of the server that replaces ais.usvisa-info.com.
+        overrides (dict[str, dict[str, str]] | None): Values replacing the ones of
+            config.ini.example, by section and key.
+
+    Returns:
+        ModuleType: The imported visa module.
+
+    """
+    os.chdir(make_workdir(base_url, overrides))
+    sys.path.insert(0, str(REPO_ROOT))
+    return importlib.import_module("visa")
+
+
+def start_headless_chrome() -> object | None:
+    """Start a headless Chrome for the browser benchmarks.
+
+    Returns:
+        object | None: The WebDriver instance, or None if Chrome could not be started.
+
+    """
+    from selenium import webdriver  # noqa: PLC0415
+
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless=new")
+    options.add_argument("--log-level=1")
+    try:
+        return webdriver.Chrome(options=options)
+    except Exception as e:
+        print(f"Chrome is not available, skipping browser benchmarks: {e}")
+        return None
+
+
+def summarize(samples: list[float]) -> dict:
+    """Summarize latency samples given in seconds.
+
+    Args:
+        samples (list[float]): The measured durations.
+
+    Returns:
+        dict: Sample count and mean/p50/p95/min/max in milliseconds.
+
+    """
+    ms = sorted(sample * 1000 for sample in samples)
+    return {
+        "n": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 4),
+        "p50_ms": round(ms[len(ms) // 2], 4),
+        "p95_ms": round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 4),
+        "min_ms": round(ms[0], 4),
+        "max_ms": round(ms[-1], 4),
+    }
@@ -0,0 +1,384 @@
+"""Local mock of ais.usvisa-info.com for offline end-to-end runs and benchmarks.
+
+It serves every page and endpoint visa.py talks to:
+- the sign in page (bounce arrow, user_email, user_password, icheckbox and commit) and its POST
+- the appointment page with its hidden form fields, and the booking POST
+- the days/times JSON endpoints of the consulate (FACILITY_ID) and CAS (CAS_FACILITY_ID)
+- the sign out link
+
+Behaviour knobs:
+- latency: seconds to wait before answering each request
+- ban: empty date lists after a number of polls (or at random) until the next login
+- churn: probability that a slot appears or disappears on each poll
+
+Point visa.py to it with BASE_URL in config.ini and run it with:
+
+    python benchmarks/mock_server.py --port 8000 --latency 0.05 --churn 0.2
+"""
+
+import argparse
+import json
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from embassy import embassies
+
+SIGN_IN_PATH = re.compile(r"^/[\w-]+/niv/users/sign_in$")
+SIGN_OUT_PATH = re.compile(r"^/[\w-]+/niv/users/sign_out$")
+ACCOUNT_PATH = re.compile(r"^/[\w-]+/niv/account$")
+APPOINTMENT_PATH = re.compile(r"^/[\w-]+/niv/schedule/\d+/appointment$")
+DAYS_PATH = re.compile(r"^/[\w-]+/niv/schedule/\d+/appointment/days/(\d+)\.json$")
+TIMES_PATH = re.compile(r"^/[\w-]+/niv/schedule/\d+/appointment/times/(\d+)\.json$")
+STATS_PATH = "/__mock__/stats"
+
+AVAILABLE_TIMES = ["07:15", "08:00", "09:45", "10:30", "11:00"]
+# One of visa.SUCCESS_PATTERNS
+SUCCESS_MESSAGE = "Usted ha programado exitosamente su cita de visa"
+# Password that makes the sign in fail with the "wrong credentials" message
+WRONG_PASSWORD = "wrong"  # noqa: S105
+# Days between the CAS appointment and the consulate appointment offered by the CAS endpoint
+CAS_DAYS_BEFORE = 10
+
+SIGN_IN_PAGE = """<html><body>
+<a class="down-arrow bounce" href="#sign_in_form">&#8595;</a>
+<form id="sign_in_form" action="{path}" method="post">
+  <input type="email" id="user_email" name="user[email]">
+  <input type="password" id="user_password" name="user[password]">
+  <div class="icheckbox" style="width:20px;height:20px;border:1px solid"
+       onclick="var c = document.getElementById('policy_confirmed'); c.checked = !c.checked;">
+    <input type="checkbox" id="policy_confirmed" name="policy_confirmed" value="1"
+           style="pointer-events:none">
+  </div>
+  <input type="submit" name="commit" value="Iniciar sesion">
+</form>
+<p>{error}</p>
+</body></html>"""
+
+ACCOUNT_PAGE = """<html><body>
+<a href="{appointment_path}">{continue_text}</a>
+</body></html>"""
+
+APPOINTMENT_PAGE = """<html><body>
+<form action="{path}" method="post">
+  <input type="hidden" name="authenticity_token" value="{token}">
+  <input type="hidden" name="confirmed_limit_message" value="1">
+  <input type="hidden" name="use_consulate_appointment_capacity" value="true">
+  <input type="submit" name="commit" value="Reprogramar">
+</form>
+</body></html>"""
+
+
+class MockAis:
+    """State of the mock appointment system shared by all the request handlers."""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        *,
+        embassy: str = "es-co-bog",
+        latency: float = 0,
+        slots: int = 20,
+        churn: float = 0,
+        ban_after: int = 0,
+        ban_rate: float = 0,
+        first_day: int = 30,
+        horizon: int = 365,
+        seed: int | None = None,
+    ) -> None:
+        """Create the mock state.
+
+        Args:
+            embassy (str): Key of embassy.py whose facilities and messages are served.
+            latency (float): Seconds to wait before answering each request.
+            slots (int): Number of consulate dates available at start.
+            churn (float): Probability, on each poll, that a random day toggles its availability.
+            ban_after (int): Answer empty date lists after this many polls (0 disables it).
+            ban_rate (float): Probability of answering an empty date list on any poll.
+            first_day (int): Days from today to the first day that can have slots.
+            horizon (int): Number of days, from first_day, that can have slots.
+            seed (int | None): Seed for the slot generator, for repeatable runs.
+
+        """
+        (
+            self.embassy,
+            self.facility_id,
+            self.cas_facility_id,
+            self.continue_text,
+            self.wrong_credentials_text,
+        ) = embassies[embassy]
+        self.latency = latency
+        self.churn = churn
+        self.ban_after = ban_after
+        self.ban_rate = ban_rate
+        self.random = random.Random(seed)  # noqa: S311
+        self.lock = threading.Lock()
+
+        start = datetime.now().date() + timedelta(days=first_day)
+        self.days = [(start + timedelta(days=i)).isoformat() for i in range(horizon)]
+        self.slots = set(self.random.sample(self.days, min(slots, horizon)))
+        self.sessions = {}  # _yatri_session cookie -> authenticity_token
+        self.banned = False
+        self.stats = Counter()
+
+    def create_session(self) -> str:
+        """Register a logged in session and lift any ban, like a login after the cooldown.
+
+        Returns:
+            str: The value of the _yatri_session cookie.
+
+        """
+        cookie = secrets.token_hex(16)
+        with self.lock:
+            self.sessions[cookie] = secrets.token_urlsafe(32)
+            self.banned = False
+            self.stats["logins"] += 1
+        return cookie
+
+    def open_slot(self, date: str) -> None:
+        """Make a consulate date available.
+
+        Args:
+            date (str): The date in YYYY-MM-DD format.
+
+        """
+        with self.lock:
+            self.slots.add(date)
+
+    def poll_dates(self) -> list[dict]:
+        """Answer a poll of the consulate days endpoint, applying ban and churn rules.
+
+        Returns:
+            list[dict]: The available dates, empty while banned.
+
+        """
+        with self.lock:
+            self.stats["polls"] += 1
+            if (self.ban_after and self.stats["polls"] % self.ban_after == 0) or (
+                self.random.random() < self.ban_rate
+            ):
+                self.banned = True
+            if self.banned:
+                self.stats["banned_polls"] += 1
+                return []
+
+            if self.random.random() < self.churn:
+                self.slots ^= {self.random.choice(self.days)}
+            return [{"date": date, "business_day": True} for date in sorted(self.slots)]
+
+    def cas_dates(self, consulate_date: str) -> list[dict]:
+        """Answer the CAS days endpoint: the business days before the consulate date.
+
+        Args:
+            consulate_date (str): The chosen consulate date.
+
+        Returns:
+            list[dict]: The available CAS dates.
+
+        """
+        consulate = datetime.strptime(consulate_date, "%Y-%m-%d").date()
+        return [
+            {"date": (consulate - timedelta(days=i)).isoformat(), "business_day": True}
+            for i in range(CAS_DAYS_BEFORE, 0, -1)
+        ]
+
+    def book(self, cookie: str, form: dict) -> bool:
+        """Try to book the consulate date in the submitted appointment form.
+
+        Args:
+            cookie (str): The _yatri_session cookie of the request.
+            form (dict): The decoded form fields.
+
+        Returns:
+            bool: True if the token is valid and the date was still available.
+
+        """
+        date = form.get("appointments[consulate_appointment][date]", [""])[0]
+        token = form.get("authenticity_token", [""])[0]
+        with self.lock:
+            self.stats["booking_attempts"] += 1
+            if self.sessions.get(cookie) != token or date not in self.slots:
+                return False
+            if not form.get("appointments[asc_appointment][time]"):
+                return False
+            self.slots.discard(date)
+            self.stats["bookings"] += 1
+            return True
+
+
+class MockAisHandler(BaseHTTPRequestHandler):
+    """Request handler serving the pages and JSON endpoints of the mock."""
+
+    # Keep-alive connections, like the real server
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self) -> None:
+        """Serve pages and JSON endpoints."""
+        ais = self._begin()
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        cookie = self._session_cookie()
+
+        if url.path == STATS_PATH:
+            self._send_json(HTTPStatus.OK, dict(ais.stats))
+        elif SIGN_IN_PATH.match(url.path):
+            self._send_html(SIGN_IN_PAGE.format(path=url.path, error=""))
+        elif SIGN_OUT_PATH.match(url.path):
+            with ais.lock:
+                ais.sessions.pop(cookie, None)
+            self._redirect(url.path.replace("sign_out", "sign_in"))
+        elif DAYS_PATH.match(url.path) or TIMES_PATH.match(url.path):
+            if cookie not in ais.sessions:
+                self._send_json(HTTPStatus.UNAUTHORIZED, {"error": "You need to sign in"})
+            else:
+                self._send_json(HTTPStatus.OK, self._availability(ais, url.path, query))
+        elif cookie not in ais.sessions:
+            self._redirect(f"/{ais.embassy}/niv/users/sign_in")
+        elif ACCOUNT_PATH.match(url.path):
+            appointment_path = f"/{ais.embassy}/niv/schedule/1/appointment"
+            self._send_html(
+                ACCOUNT_PAGE.format(
+                    appointment_path=appointment_path,
+                    continue_text=ais.continue_text,
+                ),
+            )
+        elif APPOINTMENT_PATH.match(url.path):
+            self._send_html(APPOINTMENT_PAGE.format(path=url.path, token=ais.sessions[cookie]))
+        else:
+            self._send_html("Not found", HTTPStatus.NOT_FOUND)
+
+    def do_POST(self) -> None:
+        """Handle the sign in and booking forms."""
+        ais = self._begin()
+        path = urlsplit(self.path).path
+        length = int(self.headers.get("Content-Length", 0))
+        form = parse_qs(self.rfile.read(length).decode())
+
+        if SIGN_IN_PATH.match(path):
+            password = form.get("user[password]", [""])[0]
+            if password == WRONG_PASSWORD or not form.get("user[email]"):
+                error = ais.wrong_credentials_text
+                self._send_html(SIGN_IN_PAGE.format(path=path, error=error))
+            elif not form.get("policy_confirmed"):
+                self._send_html(SIGN_IN_PAGE.format(path=path, error="Accept the policy"))
+            else:
+                cookie = ais.create_session()
+                self._redirect(f"/{ais.embassy}/niv/account", cookie)
+        elif APPOINTMENT_PATH.match(path):
+            if ais.book(self._session_cookie(), form):
+                self._send_html(f"<html><body>{SUCCESS_MESSAGE}</body></html>")
+            else:
+                self._send_html("<html><body>La cita ya no esta disponible</body></html>")
+        else:
+            self._send_html("Not found", HTTPStatus.NOT_FOUND)
+
+    def log_message(self, *_args: object) -> None:
+        """Silence the per-request access log."""
+
+    def _begin(self) -> MockAis:
+        ais = self.server.ais
+        with ais.lock:
+            ais.stats["requests"] += 1
+        time.sleep(ais.latency)
+        return ais
+
+    def _availability(self, ais: MockAis, path: str, query: dict) -> list | dict:
+        days = DAYS_PATH.match(path)
+        facility = int((days or TIMES_PATH.match(path)).group(1))
+        if days and facility == ais.facility_id:
+            return ais.poll_dates()
+        if days and facility == ais.cas_facility_id:
+            return ais.cas_dates(query["consulate_date"][0])
+
+        date = query.get("date", [""])[0]
+        if facility == ais.facility_id and date not in ais.slots:
+            return {"available_times": [], "business_times": []}
+        return {"available_times": AVAILABLE_TIMES, "business_times": AVAILABLE_TIMES}
+
+    def _session_cookie(self) -> str:
+        for item in self.headers.get("Cookie", "").split(";"):
+            name, _, value = item.strip().partition("=")
+            if name == "_yatri_session":
+                return value
+        return ""
+
+    def _redirect(self, location: str, cookie: str | None = None) -> None:
+        self.send_response(HTTPStatus.FOUND)
+        self.send_header("Location", location)
+        if cookie:
+            self.send_header("Set-Cookie", f"_yatri_session={cookie}; path=/; HttpOnly")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _send_html(self, html: str, status: HTTPStatus = HTTPStatus.OK) -> None:
+        self._send(status, "text/html; charset=utf-8", html.encode())
+
+    def _send_json(self, status: HTTPStatus, payload: dict | list) -> None:
+        self._send(status, "application/json; charset=utf-8", json.dumps(payload).encode())
+
+    def _send(self, status: HTTPStatus, content_type: str, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_server(
+    host: str = "127.0.0.1",
+    port: int = 0,
+    **mock_options: object,
+) -> ThreadingHTTPServer:
+    """Start the mock server in a daemon thread.
+
+    Args:
+        host (str): Interface to bind.
+        port (int): Port to bind, 0 picks a free one.
+        **mock_options: Keyword arguments for MockAis (latency, churn, ban_after...).
+
+    Returns:
+        ThreadingHTTPServer: The running server. Its `ais` attribute holds the MockAis state
+        and `base_url` the value to use as BASE_URL.
+
+    """
+    server = ThreadingHTTPServer((host, port), MockAisHandler)
+    server.daemon_threads = True
+    server.ais = MockAis(**mock_options)
+    server.base_url = f"http://{host}:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--embassy", default="es-co-bog")
+    parser.add_argument("--latency", type=float, default=0)
+    parser.add_argument("--slots", type=int, default=20)
+    parser.add_argument("--churn", type=float, default=0)
+    parser.add_argument("--ban-after", type=int, default=0)
+    parser.add_argument("--ban-rate", type=float, default=0)
+    parser.add_argument("--first-day", type=int, default=30)
+    parser.add_argument("--horizon", type=int, default=365)
+    parser.add_argument("--seed", type=int)
+    args = vars(parser.parse_args())
+
+    host, port = args.pop("host"), args.pop("port")
+    mock = ThreadingHTTPServer((host, port), MockAisHandler)
+    mock.ais = MockAis(**args)
+    print(f"Mock server listening on http://{host}:{port}")
+    mock.serve_forever()
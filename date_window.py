@@ -0,0 +1,168 @@
+"""Target window of appointment dates, parsed once when the configuration is loaded.
+
+A window is made of one or more date ranges, optionally minus some excluded dates and limited to
+some weekdays. Dates are handled as ISO strings (YYYY-MM-DD), which sort like the dates they
+represent, so the sorted list of available dates is searched with bisect instead of parsing
+every date.
+"""
+
+import bisect
+import functools
+from collections.abc import Iterable
+from datetime import date
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+
+@functools.lru_cache(maxsize=4096)
+def _weekday(iso_date: str) -> int:
+    return date.fromisoformat(iso_date).weekday()
+
+
+def _check_iso(value: str) -> str:
+    value = value.strip()
+    try:
+        parsed = date.fromisoformat(value)
+    except ValueError:
+        parsed = None
+    # Only the canonical form compares correctly as a string
+    if parsed is None or parsed.isoformat() != value:
+        msg = f"Invalid date '{value}', expected YYYY-MM-DD"
+        raise ValueError(msg)
+    return value
+
+
+class DateWindow:
+    """Set of acceptable appointment dates."""
+
+    def __init__(
+        self,
+        ranges: list[tuple[str, str]],
+        excluded: Iterable[str] = (),
+        weekdays: Iterable[int] | None = None,
+    ) -> None:
+        """Create the window.
+
+        Args:
+            ranges (list[tuple[str, str]]): Inclusive (start, end) ranges of ISO dates.
+            excluded (Iterable[str]): ISO dates not accepted even inside a range.
+            weekdays (Iterable[int] | None): Accepted weekdays (Monday = 0), all if None.
+
+        Raises:
+            ValueError: If a date is not YYYY-MM-DD or a range ends before it starts.
+
+        """
+        parsed = []
+        for start, end in ranges:
+            start, end = _check_iso(start), _check_iso(end)  # noqa: PLW2901
+            if end < start:
+                msg = f"The period {start} - {end} ends before it starts"
+                raise ValueError(msg)
+            parsed.append((start, end))
+
+        # Overlapping ranges are merged so the matches come out sorted and without repetitions
+        self.ranges = []
+        for start, end in sorted(parsed):
+            if self.ranges and start <= self.ranges[-1][1]:
+                self.ranges[-1] = (self.ranges[-1][0], max(end, self.ranges[-1][1]))
+            else:
+                self.ranges.append((start, end))
+        self.excluded = frozenset(_check_iso(d) for d in excluded)
+        self.weekdays = None if weekdays is None else frozenset(weekdays)
+
+    @classmethod
+    def from_config(
+        cls,
+        start: str,
+        end: str,
+        extra_periods: str = "",
+        excluded_dates: str = "",
+        weekdays: str = "",
+    ) -> "DateWindow":
+        """Build the window from the text of the configuration options.
+
+        Args:
+            start (str): Start of the main period.
+            end (str): End of the main period.
+            extra_periods (str): More periods, e.g. "2025-07-01:2025-07-31, 2025-09-01:2025-09-05".
+            excluded_dates (str): Dates to skip, e.g. "2025-12-24, 2025-12-31".
+            weekdays (str): Accepted weekdays, e.g. "mon, tue, thu". All if empty.
+
+        Returns:
+            DateWindow: The window.
+
+        Raises:
+            ValueError: If an option is malformed.
+
+        """
+        ranges = [(start, end)]
+        for period in filter(None, (p.strip() for p in extra_periods.split(","))):
+            period_start, sep, period_end = period.partition(":")
+            if not sep:
+                msg = f"Invalid period '{period}', expected YYYY-MM-DD:YYYY-MM-DD"
+                raise ValueError(msg)
+            ranges.append((period_start, period_end))
+
+        excluded = [d for d in (d.strip() for d in excluded_dates.split(",")) if d]
+
+        days = None
+        names = [d.strip().lower()[:3] for d in weekdays.split(",") if d.strip()]
+        if names:
+            unknown = [name for name in names if name not in WEEKDAYS]
+            if unknown:
+                msg = f"Invalid weekdays {unknown}, expected some of {', '.join(WEEKDAYS)}"
+                raise ValueError(msg)
+            days = [WEEKDAYS.index(name) for name in names]
+        return cls(ranges, excluded, days)
+
+    def matches(self, dates: list[str]) -> list[str]:
+        """Return every accepted date of a sorted list.
+
+        Args:
+            dates (list[str]): ISO dates sorted in ascending order.
+
+        Returns:
+            list[str]: The accepted dates, sorted.
+
+        """
+        accepted = []
+        for start, end in self.ranges:
+            first = bisect.bisect_left(dates, start)
+            last = bisect.bisect_right(dates, end, lo=first)
+            accepted.extend(d for d in dates[first:last] if self._accepts(d))
+        return accepted
+
+    def __eq__(self, other: object) -> bool:
+        """Return whether two windows accept the same dates.
+
+        Args:
+            other (object): The object to compare with.
+
+        Returns:
+            bool: True if both have the same ranges, excluded dates and weekdays.
+
+        """
+        if not isinstance(other, DateWindow):
+            return NotImplemented
+        return (self.ranges, self.excluded, self.weekdays) == (
+            other.ranges,
+            other.excluded,
+            other.weekdays,
+        )
+
+    # Mutable fields: not usable as a dict key
+    __hash__ = None
+
+    def _accepts(self, iso_date: str) -> bool:
+        if iso_date in self.excluded:
+            return False
+        return self.weekdays is None or _weekday(iso_date) in self.weekdays
+
+    def __str__(self) -> str:
+        """Describe the window for the log messages."""
+        text = ", ".join(f"({start}) - ({end})" for start, end in self.ranges)
+        if self.excluded:
+            text += f" except {', '.join(sorted(self.excluded))}"
+        if self.weekdays is not None:
+            text += f" on {', '.join(WEEKDAYS[d] for d in sorted(self.weekdays))}"
+        return text
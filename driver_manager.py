@@ -0,0 +1,204 @@
+"""WebDriver lifecycle: one active browser plus a warm standby ready to replace it.
+
+Launching Chrome (and resolving chromedriver) takes seconds. The manager starts a second
+instance in a background thread, so when the active one crashes or is recycled the standby is
+swapped in immediately and a new standby is launched in the background.
+
+The memory and CPU of the active browser (chromedriver and all its Chrome processes) are
+measured with psutil, if it is installed. It is only imported for the first measure.
+"""
+
+import json
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from selenium.webdriver.remote.webdriver import WebDriver
+
+
+def resolve_chromedriver(cache_file: str, install: Callable[[], str]) -> str:
+    """Return the chromedriver path, resolving it only if the cached one does not exist.
+
+    Args:
+        cache_file (str): JSON file where the resolved path is cached.
+        install (Callable): Function downloading/locating chromedriver and returning its path,
+            e.g. ChromeDriverManager().install.
+
+    Returns:
+        str: The path of the chromedriver executable.
+
+    """
+    path = Path(cache_file)
+    try:
+        cached = json.loads(path.read_text(encoding="utf-8"))["path"]
+    except (OSError, ValueError, KeyError):
+        cached = None
+    if cached and Path(cached).is_file():
+        return cached
+
+    driver_path = install()
+    try:
+        path.write_text(json.dumps({"path": driver_path}), encoding="utf-8")
+    except OSError as e:
+        print(f"Could not cache the chromedriver path in {cache_file}: {e}")
+    return driver_path
+
+
+def is_alive(driver: "WebDriver | None") -> bool:
+    """Return whether a driver still answers commands.
+
+    Args:
+        driver (WebDriver | None): The driver.
+
+    Returns:
+        bool: False if it is None, was closed or its browser crashed.
+
+    """
+    if driver is None:
+        return False
+    try:
+        driver.execute_script("return 1;")
+    except Exception:
+        return False
+    return True
+
+
+class DriverManager:
+    """Keep an active driver and, optionally, a warm standby one."""
+
+    def __init__(self, factory: Callable[[], "WebDriver"], *, standby: bool = True) -> None:
+        """Create the manager. No browser is launched until start().
+
+        Args:
+            factory (Callable): Function launching a new driver. It may raise.
+            standby (bool): Keep a second browser launched in the background.
+
+        """
+        self.factory = factory
+        self.standby = standby
+        self.active = None
+        self._standby_driver = None
+        self._standby_thread = None
+        self._lock = threading.Lock()
+        # (pid, monotonic time, CPU seconds) of the previous usage() measure
+        self._last_cpu = None
+
+    def start(self) -> "WebDriver":
+        """Launch the active driver and start provisioning the standby one.
+
+        Returns:
+            WebDriver: The active driver.
+
+        Raises:
+            Exception: Any error of the factory.
+
+        """
+        self.active = self.factory()
+        self._provision_standby()
+        return self.active
+
+    def replace(self) -> "WebDriver":
+        """Quit the active driver and swap in the standby one (or launch a new one).
+
+        Returns:
+            WebDriver: The new active driver.
+
+        Raises:
+            Exception: Any error of the factory when there is no standby driver.
+
+        """
+        self._quit(self.active)
+        self.active = None
+        if self._standby_thread is not None:
+            self._standby_thread.join()
+        with self._lock:
+            driver, self._standby_driver = self._standby_driver, None
+
+        if not is_alive(driver):
+            self._quit(driver)
+            driver = self.factory()
+        self.active = driver
+        self._provision_standby()
+        return driver
+
+    def usage(self) -> dict | None:
+        """Measure the processes of the active local browser.
+
+        Returns:
+            dict | None: rss_mb (resident memory in MiB), cpu_percent (of one core, since the
+                previous measure) and processes. None without psutil or for a remote browser.
+
+        """
+        service = getattr(self.active, "service", None)
+        process = getattr(service, "process", None)
+        if process is None:
+            return None
+        try:
+            import psutil  # noqa: PLC0415
+        except ImportError:  # Optional: without it there are no memory/CPU figures nor recycling
+            return None
+        try:
+            root = psutil.Process(process.pid)
+            processes = [root, *root.children(recursive=True)]
+        except psutil.Error:
+            return None
+
+        rss = cpu_time = 0
+        for proc in processes:
+            try:
+                rss += proc.memory_info().rss
+                times = proc.cpu_times()
+                cpu_time += times.user + times.system
+            except psutil.Error:
+                continue  # Exited while being measured
+
+        now = time.monotonic()
+        cpu_percent = 0.0
+        if self._last_cpu is not None and self._last_cpu[0] == process.pid:
+            _, last_time, last_cpu_time = self._last_cpu
+            if now > last_time:
+                cpu_percent = max(0.0, cpu_time - last_cpu_time) / (now - last_time) * 100
+        self._last_cpu = (process.pid, now, cpu_time)
+        return {
+            "rss_mb": rss / (1024 * 1024),
+            "cpu_percent": cpu_percent,
+            "processes": len(processes),
+        }
+
+    def shutdown(self) -> None:
+        """Quit the active and the standby drivers."""
+        if self._standby_thread is not None:
+            self._standby_thread.join()
+        with self._lock:
+            drivers, self._standby_driver = [self.active, self._standby_driver], None
+        self.active = None
+        for driver in drivers:
+            self._quit(driver)
+
+    def _provision_standby(self) -> None:
+        if not self.standby:
+            return
+
+        def launch() -> None:
+            try:
+                driver = self.factory()
+            except Exception as e:
+                print(f"Could not launch the standby browser: {e}")
+                return
+            with self._lock:
+                self._standby_driver = driver
+
+        self._standby_thread = threading.Thread(target=launch, name="driver-standby", daemon=True)
+        self._standby_thread.start()
+
+    @staticmethod
+    def _quit(driver: "WebDriver | None") -> None:
+        if driver is None:
+            return
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"Could not quit the browser: {e}")
@@ -12,3 +12,18 @@ embassies = {
         "Correo electrónico o contraseña inválida",
     ],  # Spanish - Colombia - Bogotá
 }
+
+# Locators of the login form, by step. Format: (STRATEGY, VALUE), where STRATEGY is a
+# selenium By value ("id", "name", "class name", "xpath", "css selector")
+DEFAULT_LOCATORS = {
+    "bounce": ("xpath", '//a[@class="down-arrow bounce"]'),
+    "email": ("id", "user_email"),
+    "password": ("id", "user_password"),
+    "privacy": ("class name", "icheckbox"),
+    "submit": ("name", "commit"),
+}
+
+# Locators by embassy (same keys as embassies). Missing steps use DEFAULT_LOCATORS
+locators = {
+    "es-co-bog": {},
+}
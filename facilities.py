@@ -0,0 +1,84 @@
+"""Consulate and CAS facilities polled from the same session.
+
+Each facility is a consulate and the CAS (Applicant Service Center) its applicants are sent to.
+The URLs of their JSON endpoints are built once, when the configuration is loaded.
+"""
+
+from typing import NamedTuple
+
+
+class Facility(NamedTuple):
+    """A consulate and its CAS facility."""
+
+    consulate_id: int
+    cas_id: int
+
+
+class FacilityUrls(NamedTuple):
+    """Endpoints of a facility. The %s are filled in the order given in each comment."""
+
+    # Available consulate dates
+    days: str
+    # Consulate times: date
+    times: str
+    # CAS dates: consulate date, consulate time
+    cas_days: str
+    # CAS times: CAS date, consulate date, consulate time
+    cas_times: str
+
+
+def parse_facilities(text: str, default: Facility) -> list[Facility]:
+    """Parse the list of facilities of the configuration.
+
+    Args:
+        text (str): Facilities separated by commas, each "CONSULATE_ID:CAS_ID" or just
+            "CONSULATE_ID" (using the CAS of `default`), e.g. "25:26, 28".
+        default (Facility): Facility used when the text is empty.
+
+    Returns:
+        list[Facility]: The facilities in the configured order.
+
+    Raises:
+        ValueError: If an id is not a number or a consulate is listed twice.
+
+    """
+    facilities = []
+    for item in filter(None, (i.strip() for i in text.split(","))):
+        consulate_id, _, cas_id = item.partition(":")
+        try:
+            facility = Facility(int(consulate_id), int(cas_id or default.cas_id))
+        except ValueError:
+            msg = f"Invalid facility '{item}', expected CONSULATE_ID:CAS_ID"
+            raise ValueError(msg) from None
+        if any(f.consulate_id == facility.consulate_id for f in facilities):
+            msg = f"The consulate {facility.consulate_id} is listed more than once"
+            raise ValueError(msg)
+        facilities.append(facility)
+    return facilities or [default]
+
+
+def facility_urls(appointment_url: str, facility: Facility) -> FacilityUrls:
+    """Build the endpoints of a facility.
+
+    Args:
+        appointment_url (str): The appointment page of the schedule, e.g.
+            https://ais.usvisa-info.com/es-co/niv/schedule/{SCHEDULE_ID}/appointment.
+        facility (Facility): The facility.
+
+    Returns:
+        FacilityUrls: The endpoints.
+
+    """
+    consulate, cas = facility
+    return FacilityUrls(
+        days=f"{appointment_url}/days/{consulate}.json?appointments[expedite]=false",
+        times=f"{appointment_url}/times/{consulate}.json?date=%s&appointments[expedite]=false",
+        cas_days=(
+            f"{appointment_url}/days/{cas}.json?&consulate_id={consulate}"
+            "&consulate_date=%s&consulate_time=%s&appointments[expedite]=false"
+        ),
+        cas_times=(
+            f"{appointment_url}/times/{cas}.json?date=%s&consulate_id={consulate}&"
+            "consulate_date=%s&consulate_time=%s&appointments[expedite]=false"
+        ),
+    )
@@ -0,0 +1,281 @@
+"""Slot release history: every availability check stored in a local SQLite database.
+
+Each check is a row of `polls` (facility, time, outcome, number of dates). Instead of the full
+list of dates, only the difference with the previous check of the facility is stored in
+`changes` (one row per date that appeared or disappeared), which keeps the database small and
+gives directly the release time and the lifetime of every slot.
+
+The report shows when new dates are released (weekday x hour heatmap) and how long the slots
+last before somebody takes them:
+
+    python history.py --db logs/history.db --facility 25 --days 30
+"""
+
+import argparse
+import sqlite3
+import time
+from pathlib import Path
+
+# A check more than this many seconds after the previous one of the facility is not compared
+# with it: the bot was stopped, so the new dates may have been released at any time in between
+MAX_DIFF_GAP = 3600
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS polls (
+    id INTEGER PRIMARY KEY,
+    facility TEXT NOT NULL,
+    polled_at REAL NOT NULL,
+    outcome TEXT NOT NULL,
+    dates INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS polls_facility_time ON polls (facility, polled_at);
+CREATE TABLE IF NOT EXISTS changes (
+    poll_id INTEGER NOT NULL REFERENCES polls (id),
+    date TEXT NOT NULL,
+    added INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS changes_poll ON changes (poll_id);
+"""
+
+
+class SlotHistory:
+    """Store of the availability checks and of the changes of the available dates."""
+
+    def __init__(self, db_path: str) -> None:
+        """Create the store. The database is opened (or created) at the first use.
+
+        Args:
+            db_path (str): Path of the SQLite file. Its directory is created if needed.
+
+        """
+        self.db_path = Path(db_path)
+        self._db = None
+        # Dates and time of the last check of each facility
+        self._last = {}
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        """Return the connection, opening the database at the first use."""
+        if self._db is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(SCHEMA)
+        return self._db
+
+    def record_poll(
+        self,
+        facility: str,
+        dates: list[str] | None,
+        polled_at: float | None = None,
+    ) -> tuple[str, set[str]]:
+        """Store the result of a check and its difference with the previous one.
+
+        Args:
+            facility (str): The facility (consulate) id.
+            dates (list[str] | None): The available dates, or None if the request failed.
+            polled_at (float | None): Unix time of the check, now by default.
+
+        Returns:
+            tuple[str, set[str]]: The outcome ("error", "empty", "baseline", "new_dates" or
+                "dates") and the dates that were not available in the previous check.
+
+        """
+        polled_at = time.time() if polled_at is None else polled_at
+        current = set(dates or ())
+        added, removed = set(), set()
+        if dates is None:
+            outcome = "error"
+        elif not dates:
+            # An empty list is the sign of a ban, not of every slot being taken
+            outcome = "empty"
+        else:
+            last_time, last_dates = self._last.get(facility) or self._load_last(facility)
+            added, removed = current - last_dates, last_dates - current
+            if last_time is None or polled_at - last_time > MAX_DIFF_GAP:
+                outcome = "baseline"
+            else:
+                outcome = "new_dates" if added else "dates"
+            self._last[facility] = (polled_at, current)
+
+        with self.db:
+            poll_id = self.db.execute(
+                "INSERT INTO polls (facility, polled_at, outcome, dates) VALUES (?, ?, ?, ?)",
+                (facility, polled_at, outcome, len(current)),
+            ).lastrowid
+            self.db.executemany(
+                "INSERT INTO changes (poll_id, date, added) VALUES (?, ?, ?)",
+                [(poll_id, date, 1) for date in sorted(added)]
+                + [(poll_id, date, 0) for date in sorted(removed)],
+            )
+        return outcome, added if outcome == "new_dates" else set()
+
+    def _load_last(self, facility: str) -> tuple[float | None, set[str]]:
+        # Time of the last successful check and the dates open after it (added, not removed)
+        row = self.db.execute(
+            "SELECT MAX(polled_at) FROM polls "
+            "WHERE facility = ? AND outcome NOT IN ('error', 'empty')",
+            (facility,),
+        ).fetchone()
+        if row[0] is None:
+            return None, set()
+        rows = self.db.execute(
+            "SELECT date FROM changes JOIN polls ON polls.id = changes.poll_id "
+            "WHERE facility = ? GROUP BY date HAVING SUM(2 * added - 1) > 0",
+            (facility,),
+        )
+        return row[0], {date for (date,) in rows}
+
+    def release_hours(self, facility: str, since: float = 0) -> list[int]:
+        """Count, by hour of the day, the checks in which new dates appeared.
+
+        Args:
+            facility (str): The facility (consulate) id.
+            since (float): Only count checks after this Unix time.
+
+        Returns:
+            list[int]: Number of releases in each hour of the day (24 values).
+
+        """
+        release_hours = [0] * 24
+        rows = self.db.execute(
+            "SELECT CAST(strftime('%H', polled_at, 'unixepoch', 'localtime') AS INTEGER), "
+            "COUNT(*) FROM polls WHERE facility = ? AND outcome = 'new_dates' "
+            "AND polled_at >= ? GROUP BY 1",
+            (facility, since),
+        )
+        for hour, count in rows:
+            release_hours[hour] = count
+        return release_hours
+
+    def release_heatmap(self, facility: str, since: float = 0) -> list[list[int]]:
+        """Count the released dates by weekday and hour of the day.
+
+        Args:
+            facility (str): The facility (consulate) id.
+            since (float): Only count checks after this Unix time.
+
+        Returns:
+            list[list[int]]: 7 rows (Monday first) of 24 counts.
+
+        """
+        heatmap = [[0] * 24 for _ in WEEKDAYS]
+        rows = self.db.execute(
+            "SELECT CAST(strftime('%w', polled_at, 'unixepoch', 'localtime') AS INTEGER), "
+            "CAST(strftime('%H', polled_at, 'unixepoch', 'localtime') AS INTEGER), COUNT(*) "
+            "FROM changes JOIN polls ON polls.id = changes.poll_id "
+            "WHERE facility = ? AND outcome = 'new_dates' AND added = 1 AND polled_at >= ? "
+            "GROUP BY 1, 2",
+            (facility, since),
+        )
+        for weekday, hour, count in rows:
+            # SQLite counts the weekdays from Sunday
+            heatmap[(weekday - 1) % 7][hour] = count
+        return heatmap
+
+    def slot_lifetimes(self, facility: str, since: float = 0) -> list[float]:
+        """Return how many seconds each released date stayed available.
+
+        Only the dates seen appearing (not the ones already available in a baseline check) and
+        later disappearing are measured.
+
+        Args:
+            facility (str): The facility (consulate) id.
+            since (float): Only measure dates released after this Unix time.
+
+        Returns:
+            list[float]: The lifetimes in seconds.
+
+        """
+        rows = self.db.execute(
+            "SELECT date, added, outcome, polled_at "
+            "FROM changes JOIN polls ON polls.id = changes.poll_id "
+            "WHERE facility = ? AND polled_at >= ? ORDER BY polled_at",
+            (facility, since),
+        )
+        released_at = {}
+        lifetimes = []
+        for date, added, outcome, polled_at in rows:
+            if added:
+                if outcome == "new_dates":
+                    released_at[date] = polled_at
+            elif date in released_at:
+                released = released_at.pop(date)
+                # After a gap the date may have been taken at any time since the previous check
+                if outcome != "baseline":
+                    lifetimes.append(polled_at - released)
+        return lifetimes
+
+    def close(self) -> None:
+        """Close the database."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+def format_duration(seconds: float) -> str:
+    """Format a duration for the report.
+
+    Args:
+        seconds (float): The duration.
+
+    Returns:
+        str: For example "1h 05m", "3m 20s" or "45s".
+
+    """
+    minutes, seconds = divmod(round(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m"
+    if minutes:
+        return f"{minutes}m {seconds:02d}s"
+    return f"{seconds}s"
+
+
+def print_report(history: SlotHistory, facility: str, since: float) -> None:
+    """Print the release heatmap and the slot lifetimes of a facility.
+
+    Args:
+        history (SlotHistory): The history store.
+        facility (str): The facility (consulate) id.
+        since (float): Only report checks after this Unix time.
+
+    """
+    (polls,) = history.db.execute(
+        "SELECT COUNT(*) FROM polls WHERE facility = ? AND polled_at >= ?",
+        (facility, since),
+    ).fetchone()
+    print(f"Facility {facility}: {polls} checks")
+
+    print("\nReleased dates by weekday and hour (local time)")
+    print("     " + " ".join(f"{hour:>3}" for hour in range(24)) + "  total")
+    for weekday, counts in zip(WEEKDAYS, history.release_heatmap(facility, since), strict=True):
+        cells = " ".join(f"{count:>3}" if count else "  ." for count in counts)
+        print(f"{weekday:<5}{cells}  {sum(counts):>5}")
+
+    lifetimes = sorted(history.slot_lifetimes(facility, since))
+    print("\nSlot lifetimes")
+    if not lifetimes:
+        print("No released date has been taken yet")
+        return
+    for label, p in (("p10", 0.1), ("p50", 0.5), ("p90", 0.9)):
+        print(f"{label}: {format_duration(lifetimes[int(p * (len(lifetimes) - 1))])}")
+    print(f"max: {format_duration(lifetimes[-1])} ({len(lifetimes)} slots)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--db", default="logs/history.db")
+    parser.add_argument("--facility", required=True)
+    parser.add_argument("--days", type=float, default=0, help="only the last N days (0 = all)")
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        parser.error(f"{args.db} does not exist")
+    history = SlotHistory(args.db)
+    print_report(history, args.facility, time.time() - args.days * 86400 if args.days else 0)
+    history.close()
@@ -0,0 +1,204 @@
+"""Buffered, non-blocking JSON lines log writer with daily and size based rotation.
+
+Callers only put the message in a bounded queue; a background thread serializes the records and
+writes them to the log file in batches. A batch is flushed when it reaches FLUSH_BYTES, when
+FLUSH_INTERVAL seconds have passed since the last flush, and when the writer is closed.
+
+Records go to {log_dir}/log_{YYYY-MM-DD}.log following the date of each record, so a process
+running for days writes one file per day. A file that grows past max_bytes is closed as
+log_{YYYY-MM-DD}.{n}.log. Closed files are compressed with gzip when the writer rotates.
+"""
+
+import gzip
+import json
+import queue
+import shutil
+import threading
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+# Maximum number of records waiting to be written. When full, new records are dropped (and
+# counted) instead of blocking the caller
+MAX_QUEUE_SIZE = 10000
+# Flush policy of the background thread
+FLUSH_BYTES = 64 * 1024
+FLUSH_INTERVAL = 1.0
+# Size of a log file that triggers its rotation
+MAX_BYTES = 50 * 1024 * 1024
+
+_STOP = object()
+
+
+class BufferedLogWriter:
+    """Write log records as JSON lines from a background thread."""
+
+    def __init__(
+        self,
+        log_dir: str,
+        max_bytes: int = MAX_BYTES,
+        max_queue_size: int = MAX_QUEUE_SIZE,
+        flush_bytes: int = FLUSH_BYTES,
+        flush_interval: float = FLUSH_INTERVAL,
+    ) -> None:
+        """Create the writer. The background thread starts with the first record.
+
+        Args:
+            log_dir (str): Directory of the log files, created when a file is opened.
+            max_bytes (int): Size of a log file that triggers its rotation.
+            max_queue_size (int): Maximum number of records waiting to be written.
+            flush_bytes (int): Buffered bytes that trigger a write.
+            flush_interval (float): Maximum seconds a record waits in the buffer.
+
+        """
+        self.log_dir = Path(log_dir)
+        self.max_bytes = max_bytes
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._file = None
+        self._file_date = None
+
+    def file_path(self, day: date) -> Path:
+        """Return the log file being written for a day.
+
+        Args:
+            day (date): The day.
+
+        Returns:
+            Path: The log file.
+
+        """
+        return self.log_dir / f"log_{day}.log"
+
+    def log(self, msg: str) -> None:
+        """Queue a message without blocking. The timestamps are taken now.
+
+        Args:
+            msg (str): The message to log.
+
+        """
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait((datetime.now(), time.monotonic(), msg))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout: float = 5) -> None:
+        """Write the pending records and stop the background thread.
+
+        Args:
+            timeout (float): Maximum seconds to wait for the pending records.
+
+        """
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        buffer = []
+        buffered_bytes = 0
+        buffer_date = None
+        last_flush = time.monotonic()
+        while True:
+            timeout = max(0, self.flush_interval - (time.monotonic() - last_flush))
+            try:
+                record = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                record = None
+
+            if record is _STOP:
+                self._flush(buffer, buffer_date)
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                return
+
+            if record is not None:
+                record_date = record[0].date()
+                if buffer and record_date != buffer_date:
+                    # Past midnight: the buffered records belong to the previous day's file
+                    self._flush(buffer, buffer_date)
+                    buffer = []
+                    buffered_bytes = 0
+                buffer_date = record_date
+                line = self._format(*record)
+                buffer.append(line)
+                buffered_bytes += len(line)
+
+            if buffered_bytes >= self.flush_bytes or (
+                time.monotonic() - last_flush >= self.flush_interval
+            ):
+                self._flush(buffer, buffer_date)
+                buffer = []
+                buffered_bytes = 0
+                last_flush = time.monotonic()
+
+    def _format(self, wall_time: datetime, monotonic: float, msg: str) -> str:
+        record = {
+            "time": wall_time.isoformat(),
+            "mono": round(monotonic, 6),
+            "msg": msg,
+        }
+        return json.dumps(record, ensure_ascii=False) + "\n"
+
+    def _flush(self, lines: list[str], day: date | None) -> None:
+        if self.dropped:
+            msg = f"{self.dropped} log records dropped (queue full)"
+            lines.append(self._format(datetime.now(), time.monotonic(), msg))
+            self.dropped = 0
+        if not lines:
+            return
+
+        day = day or datetime.now().date()
+        try:
+            if self._file is None or day != self._file_date:
+                self._rotate(day)
+            self._file.writelines(lines)
+            self._file.flush()
+            if self._file.tell() >= self.max_bytes:
+                self._rotate(day)
+        except OSError as e:
+            print(f"Failed to write log file {self.file_path(day)}: {e}")
+
+    def _rotate(self, day: date) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        # Only runs when a file is opened: at the first record, past midnight or when full
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+
+        path = self.file_path(day)
+        if path.exists() and path.stat().st_size >= self.max_bytes:
+            n = 1
+            while (self.log_dir / f"log_{day}.{n}.log.gz").exists():
+                n += 1
+            path.rename(self.log_dir / f"log_{day}.{n}.log")
+        self._compress_closed_files(path)
+
+        self._file = path.open("a", encoding="utf-8")
+        self._file_date = day
+
+    def _compress_closed_files(self, active_path: Path) -> None:
+        for path in self.log_dir.glob("log_*.log"):
+            if path == active_path:
+                continue
+            # Append mode adds a gzip member if the archive exists, zcat reads them all
+            with path.open("rb") as source, gzip.open(f"{path}.gz", "ab") as target:
+                shutil.copyfileobj(source, target)
+            path.unlink()
@@ -0,0 +1,219 @@
+"""Lightweight in-process latency histograms and event counters with periodic export.
+
+Durations are recorded by stage name (a decorated function or a manual observation). Each stage
+keeps cumulative histogram buckets plus a window of recent samples used for p50/p95/p99. Events
+(e.g. retries) are counted by name. The metrics are exported in Prometheus text format to a file
+and, optionally, to a local endpoint.
+"""
+
+import atexit
+import functools
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Upper bounds (seconds) of the histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Number of recent samples used to compute the percentiles of each stage
+PERCENTILE_WINDOW = 2048
+PERCENTILES = (0.5, 0.95, 0.99)
+METRIC_NAME = "visa_stage_latency_seconds"
+COUNTER_NAME = "visa_events_total"
+
+
+class LatencyHistogram:
+    """Histogram of the durations of one stage."""
+
+    def __init__(self) -> None:
+        """Create an empty histogram."""
+        self.bucket_counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=PERCENTILE_WINDOW)
+
+    def observe(self, seconds: float) -> None:
+        """Add one duration to the histogram.
+
+        Args:
+            seconds (float): The measured duration.
+
+        """
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.bucket_counts[i] += 1
+                break
+
+    def percentiles(self) -> dict:
+        """Return p50/p95/p99 of the recent samples.
+
+        Returns:
+            dict: Duration in seconds by percentile (0.5, 0.95, 0.99).
+
+        """
+        samples = sorted(self.recent)
+        if not samples:
+            return dict.fromkeys(PERCENTILES, 0.0)
+        return {p: samples[min(len(samples) - 1, int(p * len(samples)))] for p in PERCENTILES}
+
+
+_histograms = {}
+_counters = {}
+_lock = threading.Lock()
+
+
+def observe(stage: str, seconds: float) -> None:
+    """Record the duration of a stage.
+
+    Args:
+        stage (str): Name of the stage.
+        seconds (float): The measured duration.
+
+    """
+    with _lock:
+        histogram = _histograms.get(stage)
+        if histogram is None:
+            histogram = _histograms[stage] = LatencyHistogram()
+        histogram.observe(seconds)
+
+
+def increment(event: str, amount: int = 1) -> None:
+    """Count an event.
+
+    Args:
+        event (str): Name of the event, e.g. "retry.cas_date.retry".
+        amount (int): How many times it happened.
+
+    """
+    with _lock:
+        _counters[event] = _counters.get(event, 0) + amount
+
+
+def timed(stage: str) -> Callable:
+    """Record the duration of every call of the decorated function.
+
+    Args:
+        stage (str): Name of the stage the function belongs to.
+
+    Returns:
+        Callable: The decorator.
+
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args: object, **kwargs: object) -> object:
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(stage, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+def prometheus_text() -> str:
+    """Render every histogram and counter in Prometheus text exposition format.
+
+    Returns:
+        str: The metrics page.
+
+    """
+    lines = [
+        f"# HELP {METRIC_NAME} Duration of the stages of the visa bot.",
+        f"# TYPE {METRIC_NAME} histogram",
+    ]
+    quantiles = [
+        f"# HELP {METRIC_NAME}_recent Percentiles of the last {PERCENTILE_WINDOW} samples.",
+        f"# TYPE {METRIC_NAME}_recent gauge",
+    ]
+    with _lock:
+        for stage, histogram in sorted(_histograms.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS, histogram.bucket_counts, strict=True):
+                cumulative += bucket_count
+                lines.append(f'{METRIC_NAME}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.extend(
+                [
+                    f'{METRIC_NAME}_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}',
+                    f'{METRIC_NAME}_sum{{stage="{stage}"}} {histogram.total:.6f}',
+                    f'{METRIC_NAME}_count{{stage="{stage}"}} {histogram.count}',
+                ],
+            )
+            quantiles.extend(
+                f'{METRIC_NAME}_recent{{stage="{stage}",quantile="{p}"}} {value:.6f}'
+                for p, value in histogram.percentiles().items()
+            )
+    events = [
+        f"# HELP {COUNTER_NAME} Number of times each event happened.",
+        f"# TYPE {COUNTER_NAME} counter",
+    ]
+    with _lock:
+        events.extend(
+            f'{COUNTER_NAME}{{event="{event}"}} {count}'
+            for event, count in sorted(_counters.items())
+        )
+    return "\n".join(lines + quantiles + events) + "\n"
+
+
+def dump(file_path: str) -> None:
+    """Write the metrics page to a file, replacing it atomically.
+
+    Args:
+        file_path (str): Destination file.
+
+    """
+    path = Path(file_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(prometheus_text())
+    tmp_path.replace(path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        body = prometheus_text().encode()
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_args: object) -> None:
+        pass
+
+
+def start_exporter(file_path: str | None, interval: float, port: int = 0) -> None:
+    """Export the metrics periodically in background threads.
+
+    Args:
+        file_path (str | None): File rewritten every `interval` seconds and at exit.
+        interval (float): Seconds between file dumps.
+        port (int): If not 0, serve the metrics on http://127.0.0.1:{port}/metrics.
+
+    """
+    if file_path:
+
+        def dump_forever() -> None:
+            while True:
+                time.sleep(interval)
+                try:
+                    dump(file_path)
+                except OSError as e:
+                    print(f"Failed to write metrics file {file_path}: {e}")
+
+        threading.Thread(target=dump_forever, name="metrics-dump", daemon=True).start()
+        atexit.register(dump, file_path)
+
+    if port:
+        server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
@@ -0,0 +1,123 @@
+"""Concurrent notification fan-out on a background executor.
+
+Every registered channel (SendGrid, Pushover, personal site...) is delivered in its own worker
+with its own timeout and retries, so a slow channel neither delays the others nor the caller.
+When all the channels of a notification finish, a delivery report is passed to the on_report
+callback and set as the result of the future returned by dispatch().
+"""
+
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import NamedTuple
+
+# Seconds before the first retry of a failed delivery, doubled on every retry
+RETRY_BACKOFF = 1.0
+
+
+class Channel(NamedTuple):
+    """A notification channel and its delivery policy."""
+
+    name: str
+    # send(title, msg, timeout) must raise if the delivery failed
+    send: Callable[[str, str, float], None]
+    timeout: float
+    retries: int
+
+
+class NotificationDispatcher:
+    """Send each notification to all the channels concurrently."""
+
+    def __init__(
+        self,
+        on_report: Callable[[str, list[dict]], None] | None = None,
+        max_workers: int = 4,
+    ) -> None:
+        """Create a dispatcher without channels.
+
+        Args:
+            on_report (Callable | None): Called with the title and the delivery report of each
+                notification, from a worker thread.
+            max_workers (int): Maximum number of deliveries running at the same time.
+
+        """
+        self.channels = []
+        self.on_report = on_report
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="notify")
+
+    def add_channel(
+        self,
+        name: str,
+        send: Callable[[str, str, float], None],
+        timeout: float,
+        retries: int = 2,
+    ) -> None:
+        """Register a channel.
+
+        Args:
+            name (str): Name of the channel in the delivery report.
+            send (Callable): Function sending (title, msg) with a timeout in seconds.
+            timeout (float): Timeout of each delivery attempt in seconds.
+            retries (int): Attempts after the first failed one.
+
+        """
+        self.channels.append(Channel(name, send, timeout, retries))
+
+    def dispatch(self, title: str, msg: str) -> Future:
+        """Send a notification to every channel without waiting for the deliveries.
+
+        Args:
+            title (str): The title of the notification.
+            msg (str): The message content of the notification.
+
+        Returns:
+            Future: Resolves to the delivery report, one dict per channel.
+
+        """
+        report_future = Future()
+        if not self.channels:
+            report_future.set_result([])
+            return report_future
+
+        report = []
+        lock = threading.Lock()
+
+        def collect(delivery: Future) -> None:
+            with lock:
+                report.append(delivery.result())
+                finished = len(report) == len(self.channels)
+            if finished:
+                if self.on_report is not None:
+                    self.on_report(title, report)
+                report_future.set_result(report)
+
+        for channel in self.channels:
+            self._executor.submit(self._deliver, channel, title, msg).add_done_callback(collect)
+        return report_future
+
+    def shutdown(self) -> None:
+        """Wait for the pending deliveries and stop the workers."""
+        self._executor.shutdown(wait=True)
+
+    @staticmethod
+    def _deliver(channel: Channel, title: str, msg: str) -> dict:
+        start = time.perf_counter()
+        error = None
+        for attempt in range(1, channel.retries + 2):
+            try:
+                channel.send(title, msg, channel.timeout)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                if attempt <= channel.retries:
+                    time.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+            else:
+                error = None
+                break
+        return {
+            "channel": channel.name,
+            "ok": error is None,
+            "attempts": attempt,
+            "seconds": time.perf_counter() - start,
+            "error": error,
+        }
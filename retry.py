@@ -0,0 +1,195 @@
+"""Retry policies for the requests to the appointment system.
+
+Each failed attempt is classified before deciding what to do:
+- retryable: network errors, timeouts, 5xx answers. Retried after an exponential backoff with
+  full jitter, so transient failures recover quickly without synchronized bursts
+- fatal: errors that would happen again, such as an answer that cannot be parsed or a 4xx
+  answer. Raised at once
+- ban: signs of the account or the IP being throttled (429 or 403 answers). Raised at once and
+  the circuit of the endpoint is opened, so it is not hammered while banned
+
+Every endpoint has a circuit breaker: after `failure_threshold` consecutive failed calls it
+opens and calls fail fast for `reset_timeout` seconds, then one trial call is let through.
+Retries and outcomes are counted in the metrics module as retry.<endpoint>.<event>.
+"""
+
+import random
+import threading
+import time
+from collections.abc import Callable
+from http import HTTPStatus
+from typing import NamedTuple
+
+import metrics
+
+RETRYABLE = "retryable"
+FATAL = "fatal"
+BAN = "ban"
+
+# Answers meaning the account or the IP is being throttled
+BAN_STATUSES = frozenset({HTTPStatus.TOO_MANY_REQUESTS, HTTPStatus.FORBIDDEN})
+# 4xx answers that may succeed if repeated
+RETRYABLE_STATUSES = frozenset({HTTPStatus.REQUEST_TIMEOUT})
+
+
+class RetryPolicy(NamedTuple):
+    """Attempts, backoff and circuit breaker of an endpoint."""
+
+    attempts: int = 5
+    # Maximum backoff before the first retry (seconds), doubled on every retry
+    base_delay: float = 0.25
+    max_delay: float = 4.0
+    # Consecutive failed calls that open the circuit, and seconds it stays open
+    failure_threshold: int = 3
+    reset_timeout: float = 60.0
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint whose circuit is open."""
+
+
+def classify_error(error: Exception) -> str:
+    """Decide whether a failed attempt is worth repeating.
+
+    Args:
+        error (Exception): The error of the attempt.
+
+    Returns:
+        str: RETRYABLE, FATAL or BAN.
+
+    """
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is not None:
+        if status in BAN_STATUSES:
+            return BAN
+        if status >= HTTPStatus.INTERNAL_SERVER_ERROR or status in RETRYABLE_STATUSES:
+            return RETRYABLE
+        return FATAL
+    # Malformed answers (including JSON decoding errors) would be malformed again
+    if isinstance(error, (ValueError, KeyError, TypeError, AttributeError)):
+        return FATAL
+    return RETRYABLE
+
+
+class Retrier:
+    """Call one endpoint with its retry policy and circuit breaker. Safe to share by threads."""
+
+    def __init__(
+        self,
+        name: str,
+        policy: RetryPolicy,
+        *,
+        fatal_errors: tuple[type[Exception], ...] = (),
+        on_retry: Callable[[str, int, Exception, float], None] | None = None,
+    ) -> None:
+        """Create the retrier.
+
+        Args:
+            name (str): Name of the endpoint in the metrics and the logs.
+            policy (RetryPolicy): The policy.
+            fatal_errors (tuple[type[Exception], ...]): Errors always raised at once, without
+                counting as a failure of the endpoint (e.g. an expired session).
+            on_retry (Callable | None): Called with (name, attempt, error, delay) before each
+                retry, e.g. to log it.
+
+        """
+        self.name = name
+        self.policy = policy
+        self.fatal_errors = fatal_errors
+        self.on_retry = on_retry
+        self.failures = 0
+        self.opened_at = None
+        # A trial call of the half-open circuit is running: the other calls still fail fast
+        self.trial_running = False
+        self._lock = threading.Lock()
+
+    def call(self, func: Callable, *args: object, **kwargs: object) -> object:
+        """Call a function, retrying it according to the policy.
+
+        Args:
+            func (Callable): The attempt. It must raise if it failed.
+            *args: Positional arguments for `func`.
+            **kwargs: Keyword arguments for `func`.
+
+        Returns:
+            object: The value returned by the first successful attempt.
+
+        Raises:
+            CircuitOpenError: If the circuit is open.
+            Exception: The error of the last attempt, if none succeeded.
+
+        """
+        trial = self._before_call()
+        try:
+            return self._attempts(func, *args, **kwargs)
+        finally:
+            if trial:
+                with self._lock:
+                    self.trial_running = False
+
+    def _attempts(self, func: Callable, *args: object, **kwargs: object) -> object:
+        for attempt in range(1, self.policy.attempts + 1):
+            try:
+                result = func(*args, **kwargs)
+            except self.fatal_errors:
+                raise
+            except Exception as e:
+                kind = classify_error(e)
+                if kind != RETRYABLE or attempt == self.policy.attempts:
+                    self._record_failure("exhausted" if kind == RETRYABLE else kind)
+                    raise
+                delay = self.backoff(attempt)
+                metrics.increment(f"retry.{self.name}.retry")
+                if self.on_retry is not None:
+                    self.on_retry(self.name, attempt, e, delay)
+                time.sleep(delay)
+            else:
+                self._record_success(recovered=attempt > 1)
+                return result
+        msg = f"{self.name}: the policy allows no attempts"
+        raise ValueError(msg)
+
+    def backoff(self, attempt: int) -> float:
+        """Return a random wait before retrying a failed attempt (full jitter).
+
+        Args:
+            attempt (int): Number of the failed attempt, from 1.
+
+        Returns:
+            float: Seconds between 0 and the exponential backoff of the attempt.
+
+        """
+        ceiling = min(self.policy.max_delay, self.policy.base_delay * 2 ** (attempt - 1))
+        return random.uniform(0, ceiling)  # noqa: S311
+
+    def _before_call(self) -> bool:
+        """Reject the call if the circuit is open. Return whether it is the trial call."""
+        with self._lock:
+            if self.opened_at is None:
+                return False
+            if time.monotonic() - self.opened_at < self.policy.reset_timeout:
+                metrics.increment(f"retry.{self.name}.rejected")
+                msg = f"{self.name} is failing, not called for {self.policy.reset_timeout:.0f} s"
+                raise CircuitOpenError(msg)
+            if self.trial_running:
+                metrics.increment(f"retry.{self.name}.rejected")
+                msg = f"{self.name} is failing, waiting for the trial call"
+                raise CircuitOpenError(msg)
+            # Half open: this call is the trial, a new failure opens the circuit again
+            self.trial_running = True
+            self.failures = self.policy.failure_threshold - 1
+            return True
+
+    def _record_success(self, *, recovered: bool) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+        if recovered:
+            metrics.increment(f"retry.{self.name}.recovered")
+
+    def _record_failure(self, event: str) -> None:
+        metrics.increment(f"retry.{self.name}.{event}")
+        with self._lock:
+            self.failures += 1
+            if event == BAN or self.failures >= self.policy.failure_threshold:
+                self.opened_at = time.monotonic()
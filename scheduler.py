@@ -0,0 +1,131 @@
+"""Adaptive polling scheduler.
+
+The wait before the next availability poll starts from a random value between the configured
+bounds and is then adjusted by:
+- the time of day: hours in which new dates were released in the past are polled faster and
+  hours without releases slower
+- recent empty-list or error responses: exponential backoff while they keep happening
+- server latency: a slow server is polled less often
+- a request budget: never more than max_requests_per_hour polls in any sliding hour
+"""
+
+import random
+import time
+from collections import deque
+from datetime import datetime
+
+HOUR = 3600
+# Limits of the time-of-day factor (fastest and slowest)
+MIN_HOUR_FACTOR = 0.5
+MAX_HOUR_FACTOR = 2.0
+# Maximum backoff exponent after consecutive empty or error responses (2 ** 4 = x16)
+MAX_BACKOFF_EXPONENT = 4
+# Average poll latency (seconds) above which the server is considered slow
+SLOW_SERVER_LATENCY = 1.0
+MAX_LATENCY_FACTOR = 3.0
+# Weight of the last sample in the moving average of the latency
+LATENCY_SMOOTHING = 0.2
+
+
+class AdaptivePollScheduler:
+    """Decide how long to wait before the next availability poll."""
+
+    def __init__(
+        self,
+        min_interval: float,
+        max_interval: float,
+        max_requests_per_hour: int,
+        release_hours: list[int] | None = None,
+    ) -> None:
+        """Create the scheduler.
+
+        Args:
+            min_interval (float): Lower bound of the base wait in seconds.
+            max_interval (float): Upper bound of the base wait in seconds.
+            max_requests_per_hour (int): Maximum polls in any sliding hour (0 disables it).
+            release_hours (list[int] | None): Number of releases of new dates seen in each hour
+                of the day (24 values), for example from SlotHistory.release_hours().
+
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_requests_per_hour = max_requests_per_hour
+        self.release_hours = list(release_hours or [0] * 24)
+        self.failure_streak = 0
+        self.latency = None
+        self._polls = deque()
+
+    def record_poll(self, latency: float, outcome: str, now: float | None = None) -> None:
+        """Record the result of a poll.
+
+        Args:
+            latency (float): Duration of the poll in seconds.
+            outcome (str): "new_dates" if dates not seen in the previous poll appeared,
+                "dates" for any other non empty answer, "empty" or "error".
+            now (float | None): time.monotonic() of the poll, for tests.
+
+        """
+        now = time.monotonic() if now is None else now
+        self._polls.append(now)
+        # Only the last hour is needed, with or without a request budget
+        self._drop_old_polls(now)
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += LATENCY_SMOOTHING * (latency - self.latency)
+
+        if outcome in {"empty", "error"}:
+            self.failure_streak += 1
+        else:
+            self.failure_streak = 0
+        if outcome == "new_dates":
+            self.release_hours[datetime.now().hour] += 1
+
+    def hour_factor(self, hour: int) -> float:
+        """Return the wait multiplier of an hour of the day from the release history.
+
+        Args:
+            hour (int): Hour of the day (0-23).
+
+        Returns:
+            float: Below 1 for hours with more releases than average, above 1 for fewer.
+
+        """
+        total = sum(self.release_hours)
+        if not total:
+            return 1.0
+        mean = total / 24
+        weight = (self.release_hours[hour] + 1) / (mean + 1)
+        return min(MAX_HOUR_FACTOR, max(MIN_HOUR_FACTOR, 1 / weight))
+
+    def next_interval(self, now: float | None = None, polls_per_round: int = 1) -> float:
+        """Return the seconds to wait before the next poll.
+
+        Args:
+            now (float | None): time.monotonic() now, for tests.
+            polls_per_round (int): Polls sharing the base wait, e.g. one per facility checked
+                in turns, so each of them is still polled once per base wait.
+
+        Returns:
+            float: The wait in seconds.
+
+        """
+        now = time.monotonic() if now is None else now
+        interval = random.uniform(self.min_interval, self.max_interval)  # noqa: S311
+        interval /= polls_per_round
+        interval *= self.hour_factor(datetime.now().hour)
+        interval *= 2 ** min(self.failure_streak, MAX_BACKOFF_EXPONENT)
+        if self.latency and self.latency > SLOW_SERVER_LATENCY:
+            interval *= min(MAX_LATENCY_FACTOR, self.latency / SLOW_SERVER_LATENCY)
+
+        if self.max_requests_per_hour:
+            self._drop_old_polls(now)
+            if len(self._polls) >= self.max_requests_per_hour:
+                # Wait until the oldest poll of the window is one hour old
+                index = len(self._polls) - self.max_requests_per_hour
+                interval = max(interval, self._polls[index] + HOUR - now)
+        return interval
+
+    def _drop_old_polls(self, now: float) -> None:
+        while self._polls and self._polls[0] <= now - HOUR:
+            self._polls.popleft()
@@ -0,0 +1,267 @@
+"""Ranking of appointment slots (consulate date and time, CAS date and time).
+
+Each slot gets a penalty, the weighted sum of the penalties of the criteria (lower is better).
+A criterion returning infinity rules the slot out. New criteria are registered with
+@criterion("name") and enabled by giving them a weight.
+
+Times are converted once to minutes since midnight, so comparing them is integer arithmetic.
+"""
+
+import functools
+import math
+from collections.abc import Callable
+from datetime import date
+from typing import NamedTuple
+
+# Default weights: a day later costs as much as 4 hours away from the desired time
+DEFAULT_WEIGHTS = {"date": 1.0, "time": 0.25, "cas_gap": 0.5, "cas_time": 0.1}
+
+
+def to_minutes(hhmm: str) -> int:
+    """Convert a "HH:MM" time to minutes since midnight.
+
+    Args:
+        hhmm (str): The time, e.g. "09:30".
+
+    Returns:
+        int: The minutes since midnight, e.g. 570.
+
+    """
+    hours, _, minutes = hhmm.partition(":")
+    return int(hours) * 60 + int(minutes)
+
+
+@functools.lru_cache(maxsize=4096)
+def _ordinal(iso_date: str) -> int:
+    return date.fromisoformat(iso_date).toordinal()
+
+
+class Slot(NamedTuple):
+    """A candidate appointment. Fields not known yet are None."""
+
+    date: str
+    # Minutes since midnight
+    time: int | None = None
+    cas_date: str | None = None
+    cas_time: int | None = None
+    # Consulate facility id, for criteria preferring some facilities
+    facility: int | None = None
+
+
+class SlotPreferences(NamedTuple):
+    """Preferences used by the criteria. Times are minutes since midnight."""
+
+    desired_time: int = 10 * 60
+    desired_cas_time: int = 10 * 60
+    earliest_time: int = 0
+    latest_time: int = 24 * 60
+    # Preferred number of days between the CAS and the consulate appointments
+    cas_days_before: int = 1
+
+
+CRITERIA = {}
+
+
+def criterion(name: str) -> Callable:
+    """Register a criterion: a function (slot, preferences) -> penalty.
+
+    Args:
+        name (str): Name of the criterion in the weights.
+
+    Returns:
+        Callable: The decorator.
+
+    """
+
+    def decorator(func: Callable[[Slot, SlotPreferences], float]) -> Callable:
+        CRITERIA[name] = func
+        return func
+
+    return decorator
+
+
+@criterion("date")
+def date_penalty(slot: Slot, _preferences: SlotPreferences) -> float:
+    """Day number of the consulate appointment: the earlier, the better."""
+    return _ordinal(slot.date)
+
+
+@criterion("time")
+def time_penalty(slot: Slot, preferences: SlotPreferences) -> float:
+    """Hours between the consulate time and the desired time."""
+    if slot.time is None:
+        return 0
+    return abs(slot.time - preferences.desired_time) / 60
+
+
+@criterion("cas_gap")
+def cas_gap_penalty(slot: Slot, preferences: SlotPreferences) -> float:
+    """Days of difference with the preferred gap between the CAS and the consulate dates."""
+    if slot.cas_date is None:
+        return 0
+    gap = _ordinal(slot.date) - _ordinal(slot.cas_date)
+    return abs(gap - preferences.cas_days_before)
+
+
+@criterion("cas_time")
+def cas_time_penalty(slot: Slot, preferences: SlotPreferences) -> float:
+    """Hours between the CAS time and the desired CAS time."""
+    if slot.cas_time is None:
+        return 0
+    return abs(slot.cas_time - preferences.desired_cas_time) / 60
+
+
+class SlotRanker:
+    """Order candidate slots from best to worst."""
+
+    def __init__(
+        self,
+        preferences: SlotPreferences | None = None,
+        weights: dict[str, float] | None = None,
+    ) -> None:
+        """Create the ranker.
+
+        Args:
+            preferences (SlotPreferences | None): Preferences of the criteria.
+            weights (dict[str, float] | None): Weight of each criterion, DEFAULT_WEIGHTS if None.
+                Criteria without weight are not evaluated.
+
+        Raises:
+            ValueError: If a weight names an unknown criterion or is negative.
+
+        """
+        self.preferences = preferences or SlotPreferences()
+        weights = DEFAULT_WEIGHTS if weights is None else weights
+        unknown = set(weights) - set(CRITERIA)
+        if unknown:
+            msg = f"Unknown slot criteria {sorted(unknown)}, expected some of {sorted(CRITERIA)}"
+            raise ValueError(msg)
+        negative = sorted(name for name, weight in weights.items() if weight < 0)
+        if negative:
+            msg = f"Negative weights {negative}: a penalty cannot be a bonus"
+            raise ValueError(msg)
+        # Criteria without weight are left out, so they do not make two rankers different
+        self.weights = {name: weight for name, weight in weights.items() if weight}
+        self._criteria = [(weight, CRITERIA[name]) for name, weight in self.weights.items()]
+
+    @classmethod
+    def from_config(  # noqa: PLR0913
+        cls,
+        *,
+        desired_time: str = "10:00",
+        desired_cas_time: str = "10:00",
+        earliest_time: str = "00:00",
+        latest_time: str = "24:00",
+        cas_days_before: int = 1,
+        weights: str = "",
+    ) -> "SlotRanker":
+        """Build the ranker from the text of the configuration options.
+
+        Args:
+            desired_time (str): Preferred consulate time (HH:MM).
+            desired_cas_time (str): Preferred CAS time (HH:MM).
+            earliest_time (str): Earliest acceptable consulate time (HH:MM).
+            latest_time (str): Latest acceptable consulate time (HH:MM).
+            cas_days_before (int): Preferred days between the CAS and the consulate dates.
+            weights (str): Weights by criterion, e.g. "date: 1, time: 0.25". Defaults if empty.
+
+        Returns:
+            SlotRanker: The ranker.
+
+        Raises:
+            ValueError: If an option is malformed.
+
+        """
+        parsed_weights = None
+        if weights.strip():
+            parsed_weights = {}
+            for item in weights.split(","):
+                name, sep, value = item.partition(":")
+                if not sep:
+                    msg = f"Invalid weight '{item.strip()}', expected name: value"
+                    raise ValueError(msg)
+                parsed_weights[name.strip()] = float(value)
+        preferences = SlotPreferences(
+            desired_time=to_minutes(desired_time),
+            desired_cas_time=to_minutes(desired_cas_time),
+            earliest_time=to_minutes(earliest_time),
+            latest_time=to_minutes(latest_time),
+            cas_days_before=cas_days_before,
+        )
+        return cls(preferences, parsed_weights)
+
+    def __eq__(self, other: object) -> bool:
+        """Return whether two rankers order slots the same way.
+
+        Args:
+            other (object): The object to compare with.
+
+        Returns:
+            bool: True if both have the same preferences and weights.
+
+        """
+        if not isinstance(other, SlotRanker):
+            return NotImplemented
+        return (self.preferences, self.weights) == (other.preferences, other.weights)
+
+    # Mutable fields: not usable as a dict key
+    __hash__ = None
+
+    def score(self, slot: Slot) -> float:
+        """Return the penalty of a slot.
+
+        Args:
+            slot (Slot): The candidate.
+
+        Returns:
+            float: The weighted penalty, infinity if the slot is ruled out.
+
+        """
+        return sum(weight * func(slot, self.preferences) for weight, func in self._criteria)
+
+    def accepts(self, slot: Slot) -> bool:
+        """Return whether a slot respects the time limits, whatever the weights.
+
+        Args:
+            slot (Slot): The candidate.
+
+        Returns:
+            bool: False if its consulate time is outside earliest_time - latest_time.
+
+        """
+        preferences = self.preferences
+        return (
+            slot.time is None or preferences.earliest_time <= slot.time <= preferences.latest_time
+        )
+
+    def rank(self, slots: list[Slot]) -> list[Slot]:
+        """Sort slots from best to worst, leaving out the ruled out ones.
+
+        Args:
+            slots (list[Slot]): The candidates.
+
+        Returns:
+            list[Slot]: The acceptable candidates, best first. Ties keep their order.
+
+        """
+        scored = sorted((self.score(slot), i) for i, slot in enumerate(slots) if self.accepts(slot))
+        return [slots[i] for score, i in scored if score != math.inf]
+
+    def rank_options(self, base: Slot, field: str, values: list[str]) -> list[str]:
+        """Rank the values of one field of a partially known slot.
+
+        Args:
+            base (Slot): The fields already chosen.
+            field (str): The field to choose ("date", "time", "cas_date" or "cas_time").
+            values (list[str]): The available values, as returned by the server.
+
+        Returns:
+            list[str]: The acceptable values, best first.
+
+        """
+        if field in {"time", "cas_time"}:
+            slots = [base._replace(**{field: to_minutes(value)}) for value in values]
+        else:
+            slots = [base._replace(**{field: value}) for value in values]
+        scored = sorted((self.score(slot), i) for i, slot in enumerate(slots) if self.accepts(slot))
+        return [values[i] for score, i in scored if score != math.inf]
@@ -0,0 +1,59 @@
+"""Browser cookies saved on disk, so a new run can reuse the session instead of logging in.
+
+The file holds the cookies as returned by WebDriver get_cookies(). It gives access to the
+account, so it is only readable by its owner.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+
+def save_cookies(cookies: list[dict], file_path: str) -> None:
+    """Write the cookies to a file, replacing it atomically.
+
+    Args:
+        cookies (list[dict]): Cookies in WebDriver format.
+        file_path (str): Destination file.
+
+    """
+    path = Path(file_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as file:
+        json.dump({"saved_at": time.time(), "cookies": cookies}, file)
+    tmp_path.replace(path)
+
+
+def load_cookies(file_path: str, max_age: float) -> list[dict]:
+    """Read the saved cookies that have not expired.
+
+    Args:
+        file_path (str): File written by save_cookies().
+        max_age (float): Seconds after which the whole file is considered stale.
+
+    Returns:
+        list[dict]: The cookies in WebDriver format, empty if there is no usable file.
+
+    """
+    try:
+        data = json.loads(Path(file_path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return []
+
+    now = time.time()
+    if now - data.get("saved_at", 0) > max_age:
+        return []
+    return [cookie for cookie in data.get("cookies", []) if cookie.get("expiry", now + 1) > now]
+
+
+def delete_cookies(file_path: str) -> None:
+    """Delete the saved cookies, for example after they were rejected.
+
+    Args:
+        file_path (str): File written by save_cookies().
+
+    """
+    Path(file_path).unlink(missing_ok=True)
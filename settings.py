@@ -0,0 +1,414 @@
+"""Options of config.ini, converted, validated and parsed once into an immutable object.
+
+Every option is read when the bot starts, so a misconfiguration stops it right away instead of
+at the first booking attempt, hours later. Dates, slot preferences, facilities, the embassy and
+the URLs are parsed here once.
+
+The file can be read again while the bot runs (see reload_settings). Only the options in
+RELOADABLE are applied then; the others (account, embassy, browser...) need a restart.
+"""
+
+import configparser
+from typing import NamedTuple
+
+from date_window import DateWindow
+from embassy import embassies
+from facilities import Facility, FacilityUrls, facility_urls, parse_facilities
+from scoring import SlotRanker, to_minutes
+
+# Resources that can be blocked in low-footprint mode (keys of visa.BLOCKED_URL_PATTERNS)
+RESOURCE_TYPES = ("images", "fonts", "css")
+# Converters of configparser, by type of option
+_GETTERS = {str: "get", int: "getint", float: "getfloat", bool: "getboolean"}
+# Highest TCP port, for METRICS_PORT
+MAX_PORT = 65535
+# Fallback of the options that must be in the file
+_REQUIRED = object()
+
+
+class ConfigError(Exception):
+    """Raised when an option of the configuration is missing or invalid."""
+
+
+class Settings(NamedTuple):
+    """Every option of the configuration, with its final type."""
+
+    # PERSONAL_INFO: account, embassy and facilities
+    username: str
+    password: str
+    schedule_id: str
+    your_embassy: str
+    # Locale of the embassy in the URLs, e.g. "es-co"
+    embassy: str
+    facility_id: int
+    cas_facility_id: int
+    regex_continue: str
+    regex_wrong_credentials: str
+    facilities: tuple[Facility, ...]
+    base_url: str
+    date_window: DateWindow
+    # PREFERENCES
+    earliest_time: str
+    latest_time: str
+    slot_ranker: SlotRanker
+    cas_candidates: int
+    # NOTIFICATION: None if not configured
+    sendgrid_api_key: str | None
+    pushover_token: str | None
+    pushover_user: str | None
+    personal_site_user: str | None
+    personal_site_pass: str | None
+    push_target_email: str | None
+    personal_pusher_url: str | None
+    # TIME: the retry bounds in seconds, the rest in hours
+    retry_time_l_bound: float
+    retry_time_u_bound: float
+    max_requests_per_hour: int
+    work_limit_time: float
+    work_cooldown_time: float
+    ban_cooldown_time: float
+    # CHROMEDRIVER
+    local_use: bool
+    hub_address: str | None
+    chromedriver_path: str
+    headless: bool
+    warm_standby: bool
+    low_footprint: bool
+    block_resources: frozenset[str]
+    browser_max_memory: float
+    resource_check_interval: float
+    http_polling: bool
+    keep_session: bool
+    session_file: str
+    session_max_age: float
+    # METRICS
+    metrics_file: str
+    metrics_interval: float
+    metrics_port: int
+    # AUDIO
+    voice_cache_dir: str
+    voice_cache_max_mb: float
+    voice_warm_up: bool
+    # URLS, built from the options above
+    sign_in_link: str
+    appointment_url: str
+    sign_out_link: str
+    facility_urls: dict[Facility, FacilityUrls]
+
+
+# Options of the notification channels
+NOTIFICATION_OPTIONS = (
+    "sendgrid_api_key",
+    "pushover_token",
+    "pushover_user",
+    "personal_site_user",
+    "personal_site_pass",
+    "push_target_email",
+    "personal_pusher_url",
+)
+# Options applied by reload_settings while the bot runs. The others would need a new browser,
+# a new login or a new polling session
+RELOADABLE = frozenset(
+    {
+        "date_window",
+        "earliest_time",
+        "latest_time",
+        "slot_ranker",
+        "cas_candidates",
+        *NOTIFICATION_OPTIONS,
+        "retry_time_l_bound",
+        "retry_time_u_bound",
+        "max_requests_per_hour",
+        "work_limit_time",
+        "work_cooldown_time",
+        "ban_cooldown_time",
+        "browser_max_memory",
+        "resource_check_interval",
+        "session_max_age",
+    },
+)
+
+
+def _read(
+    config: configparser.ConfigParser,
+    section: str,
+    key: str,
+    kind: type = str,
+    fallback: object = _REQUIRED,
+) -> object:
+    getter = getattr(config, _GETTERS[kind])
+    try:
+        if fallback is _REQUIRED:
+            return getter(section, key)
+        return getter(section, key, fallback=fallback)
+    except (configparser.NoSectionError, configparser.NoOptionError):
+        msg = f"[{section}] {key} is missing"
+        raise ConfigError(msg) from None
+    except (configparser.Error, ValueError) as e:
+        # e.g. a "%" not written as "%%" (interpolation syntax)
+        msg = f"[{section}] {key}: {e}"
+        raise ConfigError(msg) from None
+
+
+def _optional(config: configparser.ConfigParser, section: str, key: str) -> str | None:
+    return _read(config, section, key, fallback="").strip() or None
+
+
+def _check(condition: bool, section: str, key: str, problem: str) -> None:  # noqa: FBT001
+    if not condition:
+        msg = f"[{section}] {key} {problem}"
+        raise ConfigError(msg)
+
+
+def _time(config: configparser.ConfigParser, key: str, fallback: str) -> str:
+    value = _read(config, "PREFERENCES", key, fallback=fallback).strip()
+    try:
+        minutes = to_minutes(value)
+    except ValueError:
+        minutes = -1
+    _check(0 <= minutes <= 24 * 60, "PREFERENCES", key, f"'{value}' is not a time (HH:MM)")
+    return value
+
+
+def _personal_info(config: configparser.ConfigParser) -> dict:
+    section = "PERSONAL_INFO"
+    username = _read(config, section, "USERNAME").strip()
+    password = _read(config, section, "PASSWORD")
+    schedule_id = _read(config, section, "SCHEDULE_ID").strip()
+    _check(bool(username), section, "USERNAME", "is empty")
+    _check(bool(password), section, "PASSWORD", "is empty")
+    _check(schedule_id.isdigit(), section, "SCHEDULE_ID", f"'{schedule_id}' is not a number")
+
+    your_embassy = _read(config, section, "YOUR_EMBASSY", fallback="es-co-bog").strip()
+    _check(
+        your_embassy in embassies,
+        section,
+        "YOUR_EMBASSY",
+        f"'{your_embassy}' is not one of {', '.join(embassies)} (see embassy.py)",
+    )
+    embassy, facility_id, cas_facility_id, regex_continue, regex_wrong_credentials = embassies[
+        your_embassy
+    ]
+    base_url = _read(config, section, "BASE_URL", fallback="https://ais.usvisa-info.com")
+    base_url = base_url.strip().rstrip("/")
+    _check(base_url.startswith(("https://", "http://")), section, "BASE_URL", "is not a URL")
+
+    try:
+        facilities = parse_facilities(
+            _read(config, section, "FACILITIES", fallback=""),
+            Facility(facility_id, cas_facility_id),
+        )
+        date_window = DateWindow.from_config(
+            _read(config, section, "PRIOD_START"),
+            _read(config, section, "PRIOD_END"),
+            extra_periods=_read(config, section, "EXTRA_PERIODS", fallback=""),
+            excluded_dates=_read(config, section, "EXCLUDED_DATES", fallback=""),
+            weekdays=_read(config, section, "WEEKDAYS", fallback=""),
+        )
+    except ValueError as e:
+        msg = f"[{section}] {e}"
+        raise ConfigError(msg) from None
+
+    appointment_url = f"{base_url}/{embassy}/niv/schedule/{schedule_id}/appointment"
+    return {
+        "username": username,
+        "password": password,
+        "schedule_id": schedule_id,
+        "your_embassy": your_embassy,
+        "embassy": embassy,
+        "facility_id": facility_id,
+        "cas_facility_id": cas_facility_id,
+        "regex_continue": regex_continue,
+        "regex_wrong_credentials": regex_wrong_credentials,
+        "facilities": tuple(facilities),
+        "base_url": base_url,
+        "date_window": date_window,
+        "sign_in_link": f"{base_url}/{embassy}/niv/users/sign_in",
+        "appointment_url": appointment_url,
+        "sign_out_link": f"{base_url}/{embassy}/niv/users/sign_out",
+        "facility_urls": {f: facility_urls(appointment_url, f) for f in facilities},
+    }
+
+
+def _preferences(config: configparser.ConfigParser) -> dict:
+    section = "PREFERENCES"
+    desired_time = _time(config, "DESIRED_TIME", "10:00")
+    earliest_time = _time(config, "EARLIEST_TIME", "00:00")
+    latest_time = _time(config, "LATEST_TIME", "24:00")
+    _check(
+        to_minutes(earliest_time) <= to_minutes(latest_time),
+        section,
+        "LATEST_TIME",
+        f"{latest_time} is before EARLIEST_TIME {earliest_time}",
+    )
+    try:
+        slot_ranker = SlotRanker.from_config(
+            desired_time=desired_time,
+            desired_cas_time=_time(config, "DESIRED_CAS_TIME", desired_time),
+            earliest_time=earliest_time,
+            latest_time=latest_time,
+            cas_days_before=_read(config, section, "CAS_DAYS_BEFORE", int, 1),
+            weights=_read(config, section, "WEIGHTS", fallback=""),
+        )
+    except ValueError as e:
+        msg = f"[{section}] {e}"
+        raise ConfigError(msg) from None
+    cas_candidates = _read(config, section, "CAS_CANDIDATES", int, 3)
+    _check(cas_candidates >= 1, section, "CAS_CANDIDATES", "must be at least 1")
+    return {
+        "earliest_time": earliest_time,
+        "latest_time": latest_time,
+        "slot_ranker": slot_ranker,
+        "cas_candidates": cas_candidates,
+    }
+
+
+def _notification(config: configparser.ConfigParser) -> dict:
+    return {name: _optional(config, "NOTIFICATION", name.upper()) for name in NOTIFICATION_OPTIONS}
+
+
+def _time_options(config: configparser.ConfigParser) -> dict:
+    section = "TIME"
+    options = {
+        "retry_time_l_bound": _read(config, section, "RETRY_TIME_L_BOUND", float),
+        "retry_time_u_bound": _read(config, section, "RETRY_TIME_U_BOUND", float),
+        "max_requests_per_hour": _read(config, section, "MAX_REQUESTS_PER_HOUR", int, 200),
+        "work_limit_time": _read(config, section, "WORK_LIMIT_TIME", float),
+        "work_cooldown_time": _read(config, section, "WORK_COOLDOWN_TIME", float),
+        "ban_cooldown_time": _read(config, section, "BAN_COOLDOWN_TIME", float),
+    }
+    _check(
+        options["retry_time_u_bound"] >= options["retry_time_l_bound"],
+        section,
+        "RETRY_TIME_U_BOUND",
+        "must not be lower than RETRY_TIME_L_BOUND",
+    )
+    _check(options["work_limit_time"] > 0, section, "WORK_LIMIT_TIME", "must be positive")
+    non_negative = (
+        "RETRY_TIME_L_BOUND",
+        "MAX_REQUESTS_PER_HOUR",
+        "WORK_COOLDOWN_TIME",
+        "BAN_COOLDOWN_TIME",
+    )
+    for key in non_negative:
+        _check(options[key.lower()] >= 0, section, key, "must not be negative")
+    return options
+
+
+def _chromedriver(config: configparser.ConfigParser) -> dict:
+    section = "CHROMEDRIVER"
+    local_use = _read(config, section, "LOCAL_USE", bool)
+    hub_address = _optional(config, section, "HUB_ADDRESS")
+    _check(
+        local_use or hub_address is not None,
+        section,
+        "HUB_ADDRESS",
+        "is needed without LOCAL_USE",
+    )
+    block_resources = frozenset(
+        name.strip().lower()
+        for name in _read(config, section, "BLOCK_RESOURCES", fallback="images, fonts").split(",")
+        if name.strip()
+    )
+    unknown = ", ".join(sorted(block_resources.difference(RESOURCE_TYPES)))
+    _check(
+        not unknown,
+        section,
+        "BLOCK_RESOURCES",
+        f"has unknown types {unknown} (use {', '.join(RESOURCE_TYPES)})",
+    )
+    options = {
+        "local_use": local_use,
+        "hub_address": hub_address,
+        "chromedriver_path": _read(config, section, "CHROMEDRIVER_PATH", fallback="").strip(),
+        "headless": _read(config, section, "HEADLESS", bool, True),  # noqa: FBT003
+        "warm_standby": _read(config, section, "WARM_STANDBY", bool, True),  # noqa: FBT003
+        "low_footprint": _read(config, section, "LOW_FOOTPRINT", bool, True),  # noqa: FBT003
+        "block_resources": block_resources,
+        "browser_max_memory": _read(config, section, "BROWSER_MAX_MEMORY", float, 1024),
+        "resource_check_interval": _read(config, section, "RESOURCE_CHECK_INTERVAL", float, 300),
+        "http_polling": _read(config, section, "HTTP_POLLING", bool, True),  # noqa: FBT003
+        "keep_session": _read(config, section, "KEEP_SESSION", bool, True),  # noqa: FBT003
+        "session_file": _read(config, section, "SESSION_FILE", fallback="session_cookies.json"),
+        "session_max_age": _read(config, section, "SESSION_MAX_AGE", float, 12),
+    }
+    _check(
+        options["resource_check_interval"] > 0,
+        section,
+        "RESOURCE_CHECK_INTERVAL",
+        "must be positive",
+    )
+    for key in ("BROWSER_MAX_MEMORY", "SESSION_MAX_AGE"):
+        _check(options[key.lower()] >= 0, section, key, "must not be negative")
+    return options
+
+
+def _metrics_and_audio(config: configparser.ConfigParser) -> dict:
+    options = {
+        "metrics_file": _read(config, "METRICS", "METRICS_FILE", fallback="logs/metrics.prom"),
+        "metrics_interval": _read(config, "METRICS", "METRICS_INTERVAL", float, 60),
+        "metrics_port": _read(config, "METRICS", "METRICS_PORT", int, 0),
+        "voice_cache_dir": _read(config, "AUDIO", "VOICE_CACHE_DIR", fallback="audio_cache"),
+        "voice_cache_max_mb": _read(config, "AUDIO", "VOICE_CACHE_MAX_MB", float, 20),
+        "voice_warm_up": _read(config, "AUDIO", "VOICE_WARM_UP", bool, True),  # noqa: FBT003
+    }
+    _check(options["metrics_interval"] > 0, "METRICS", "METRICS_INTERVAL", "must be positive")
+    _check(0 <= options["metrics_port"] <= MAX_PORT, "METRICS", "METRICS_PORT", "is not a port")
+    _check(options["voice_cache_max_mb"] > 0, "AUDIO", "VOICE_CACHE_MAX_MB", "must be positive")
+    return options
+
+
+def load_settings(file_path: str) -> Settings:
+    """Read, convert and validate every option of a configuration file.
+
+    Args:
+        file_path (str): The configuration file, e.g. config.ini.
+
+    Returns:
+        Settings: The options.
+
+    Raises:
+        ConfigError: If the file cannot be read or an option is missing or invalid.
+
+    """
+    config = configparser.ConfigParser()
+    try:
+        if not config.read(file_path, encoding="utf-8"):
+            msg = f"{file_path} not found"
+            raise ConfigError(msg)
+    except configparser.Error as e:
+        msg = f"{file_path} is malformed: {e}"
+        raise ConfigError(msg) from None
+
+    return Settings(
+        **_personal_info(config),
+        **_preferences(config),
+        **_notification(config),
+        **_time_options(config),
+        **_chromedriver(config),
+        **_metrics_and_audio(config),
+    )
+
+
+def reload_settings(current: Settings, file_path: str) -> tuple[Settings, list[str]]:
+    """Read the configuration file again, applying only the RELOADABLE options.
+
+    Args:
+        current (Settings): The settings in use.
+        file_path (str): The configuration file.
+
+    Returns:
+        tuple[Settings, list[str]]: The settings to use from now on, and the options that
+            changed but are only applied after a restart.
+
+    Raises:
+        ConfigError: If the new file is invalid. The current settings remain in use.
+
+    """
+    new = load_settings(file_path)
+    pending = [
+        name.upper()
+        for name in Settings._fields
+        if name not in RELOADABLE and getattr(new, name) != getattr(current, name)
+    ]
+    return current._replace(**{name: getattr(new, name) for name in RELOADABLE}), pending
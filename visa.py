@@ -1,97 +1,136 @@
 """Module for handling visa-related operations and configurations."""
 
-import configparser
+import atexit
+import functools
 import json
 import locale
-import random
+import operator
+import signal
+import sqlite3
+import sys
 import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
+from http import HTTPStatus
 from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
 from urllib.parse import urlencode
 
 import requests
-from gtts import gTTS  # To Google voice
-from playsound import playsound
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions
-from selenium.webdriver.support.ui import WebDriverWait
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
-from webdriver_manager.chrome import ChromeDriverManager
-
-from embassy import embassies
-
-config = configparser.ConfigParser()
-config.read("config.ini")
+from selenium.common.exceptions import (
+    ElementClickInterceptedException,
+    ElementNotInteractableException,
+    SessionNotCreatedException,
+    StaleElementReferenceException,
+)
+
+import metrics
+from available_dates import AvailableDates, DatesUpdate
+from driver_manager import DriverManager, is_alive, resolve_chromedriver
+from embassy import DEFAULT_LOCATORS, locators
+from facilities import Facility
+from history import SlotHistory
+from log_writer import BufferedLogWriter
+from notifications import NotificationDispatcher
+from retry import Retrier, RetryPolicy
+from scheduler import AdaptivePollScheduler
+from scoring import Slot, to_minutes
+from session_store import delete_cookies, load_cookies, save_cookies
+from settings import NOTIFICATION_OPTIONS, ConfigError, load_settings, reload_settings
+from voice import AudioPlayer, VoiceCache
+
+# The browser, the audio output and the email client are imported when first used, so the bot
+# starts (and validates its configuration) without loading the features it does not need
+if TYPE_CHECKING:
+    from selenium import webdriver
+
+# Every option of the configuration, validated and parsed once. The options that can change
+# while the bot runs (settings.RELOADABLE) are always read from SETTINGS, which is replaced when
+# the process receives SIGHUP; the others are bound to the constants below
+CONFIG_FILE = "config.ini"
+try:
+    SETTINGS = load_settings(CONFIG_FILE)
+except ConfigError as e:
+    sys.exit(f"Invalid configuration: {e}")
+# Set by the SIGHUP handler, the configuration is reloaded at the next check
+RELOAD_REQUESTED = False
 
 # PERSONAL INFORMATION:
 # Account and current appointment info from https://ais.usvisa-info.com
-USERNAME = config["PERSONAL_INFO"]["USERNAME"]
-PASSWORD = config["PERSONAL_INFO"]["PASSWORD"]
+USERNAME = SETTINGS.username
+PASSWORD = SETTINGS.password
 # Find SCHEDULE_ID in re-schedule page link:
 # https://ais.usvisa-info.com/en-am/niv/schedule/{SCHEDULE_ID}/appointment
-SCHEDULE_ID = config["PERSONAL_INFO"]["SCHEDULE_ID"]
-# Target Period:
-PRIOD_START = config["PERSONAL_INFO"]["PRIOD_START"]
-PRIOD_END = config["PERSONAL_INFO"]["PRIOD_END"]
+SCHEDULE_ID = SETTINGS.schedule_id
 # Embassy Section:
-YOUR_EMBASSY = config["PERSONAL_INFO"].get("YOUR_EMBASSY", "es-co-bog")
-EMBASSY = embassies[YOUR_EMBASSY][0]
-FACILITY_ID = embassies[YOUR_EMBASSY][1]
-CAS_FACILITY_ID = embassies[YOUR_EMBASSY][2]
-REGEX_CONTINUE = embassies[YOUR_EMBASSY][3]
-REGEX_WRONG_CREDENTIALS = embassies[YOUR_EMBASSY][4]
-
-# NOTIFICATION:
-# Get email notifications via https://sendgrid.com/ (Optional)
-SENDGRID_API_KEY = config["NOTIFICATION"].get("SENDGRID_API_KEY", None)
-# Get push notifications via https://pushover.net/ (Optional)
-PUSHOVER_TOKEN = config["NOTIFICATION"].get("PUSHOVER_TOKEN", None)
-PUSHOVER_USER = config["NOTIFICATION"].get("PUSHOVER_USER", None)
-# Get push notifications via PERSONAL WEBSITE http://yoursite.com (Optional)
-PERSONAL_SITE_USER = config["NOTIFICATION"].get("PERSONAL_SITE_USER", None)
-PERSONAL_SITE_PASS = config["NOTIFICATION"].get("PERSONAL_SITE_PASS", None)
-PUSH_TARGET_EMAIL = config["NOTIFICATION"].get("PUSH_TARGET_EMAIL", None)
-PERSONAL_PUSHER_URL = config["NOTIFICATION"].get("PERSONAL_PUSHER_URL", None)
+YOUR_EMBASSY = SETTINGS.your_embassy
+EMBASSY = SETTINGS.embassy
+FACILITY_ID = SETTINGS.facility_id
+CAS_FACILITY_ID = SETTINGS.cas_facility_id
+REGEX_CONTINUE = SETTINGS.regex_continue
+REGEX_WRONG_CREDENTIALS = SETTINGS.regex_wrong_credentials
+# Facilities polled from the same session, e.g. "25:26, 28:26". The embassy ones by default
+FACILITIES = list(SETTINGS.facilities)
+FACILITY_BY_ID = {facility.consulate_id: facility for facility in FACILITIES}
+# Locators of the login form, resolved once: the ones of the embassy over the defaults
+LOCATORS = {**DEFAULT_LOCATORS, **locators.get(YOUR_EMBASSY, {})}
+# Link shown after logging in, and message shown when the credentials are wrong
+CONTINUE_LOCATOR = ("xpath", f"//a[contains(text(), '{REGEX_CONTINUE}')]")
+WRONG_CREDENTIALS_LOCATOR = ("xpath", f"//*[contains(text(), '{REGEX_WRONG_CREDENTIALS}')]")
+# Root of the appointment system. Only change it to run the bot against a local mock server
+BASE_URL = SETTINGS.base_url
 
 # TIME SECTION:
 MINUTE = 60
 HOUR = 60 * MINUTE
-# Time between steps (interactions with forms)
-STEP_TIME = 0.5
-# Time between retries/checks for available dates (seconds)
-RETRY_TIME_L_BOUND = config["TIME"].getfloat("RETRY_TIME_L_BOUND")
-RETRY_TIME_U_BOUND = config["TIME"].getfloat("RETRY_TIME_U_BOUND")
-# Cooling down after WORK_LIMIT_TIME hours of work (Avoiding Ban)
-WORK_LIMIT_TIME = config["TIME"].getfloat("WORK_LIMIT_TIME")
-WORK_COOLDOWN_TIME = config["TIME"].getfloat("WORK_COOLDOWN_TIME")
-# Temporary Banned (empty list): wait COOLDOWN_TIME hours
-BAN_COOLDOWN_TIME = config["TIME"].getfloat("BAN_COOLDOWN_TIME")
+# Maximum wait for an element of a form to be ready, and for a page to load (seconds)
+STEP_TIMEOUT = 10
+PAGE_TIMEOUT = 30
+# How often the browser waits check their condition (seconds)
+WAIT_POLL_FREQUENCY = 0.05
 
 # CHROME DRIVER:
 # Details for the script to control Chrome
-LOCAL_USE = config["CHROMEDRIVER"].getboolean("LOCAL_USE")
+LOCAL_USE = SETTINGS.local_use
 # Optional: HUB_ADDRESS is mandatory only when LOCAL_USE = False
-HUB_ADDRESS = config["CHROMEDRIVER"].get("HUB_ADDRESS", None)
+HUB_ADDRESS = SETTINGS.hub_address
+# Optional: path of the chromedriver executable. If empty it is resolved with webdriver-manager
+# once and cached in CHROMEDRIVER_CACHE_FILE, until Chrome rejects it (e.g. after an update)
+CHROMEDRIVER_PATH = SETTINGS.chromedriver_path
+CHROMEDRIVER_CACHE_FILE = ".chromedriver_path.json"
+# Run Chrome without a window
+HEADLESS = SETTINGS.headless
+# Keep a second browser launched in the background to replace the active one if it crashes
+WARM_STANDBY = SETTINGS.warm_standby
+# Launch Chrome without GPU, extensions nor the downloads of BLOCK_RESOURCES, to reduce its
+# memory and CPU in long-running deployments
+LOW_FOOTPRINT = SETTINGS.low_footprint
+# Resources not downloaded in low-footprint mode: some of images, fonts, css. Blocking css is
+# opt-in because the checkboxes of the booking forms are styled widgets
+BLOCK_RESOURCES = SETTINGS.block_resources
+# Poll the JSON endpoints over plain HTTP reusing the browser session cookie. Chrome is only
+# used to log in (and to log in again when the cookie expires)
+HTTP_POLLING = SETTINGS.http_polling
+# Keep the session through breaks and bans and save its cookies in SESSION_FILE, so a restart
+# only logs in again if the saved session is no longer valid
+KEEP_SESSION = SETTINGS.keep_session
+SESSION_FILE = SETTINGS.session_file
+
+# METRICS:
+# Latency histograms of each stage, written in Prometheus text format every METRICS_INTERVAL
+# seconds to METRICS_FILE and, if METRICS_PORT is not 0, served on http://127.0.0.1:PORT/metrics
+METRICS_FILE = SETTINGS.metrics_file
+METRICS_INTERVAL = SETTINGS.metrics_interval
+METRICS_PORT = SETTINGS.metrics_port
 
 # URLS:
-SIGN_IN_LINK = f"https://ais.usvisa-info.com/{EMBASSY}/niv/users/sign_in"
-APPOINTMENT_URL = f"https://ais.usvisa-info.com/{EMBASSY}/niv/schedule/{SCHEDULE_ID}/appointment"
-DATE_URL = f"https://ais.usvisa-info.com/{EMBASSY}/niv/schedule/{SCHEDULE_ID}/appointment/days/{FACILITY_ID}.json?appointments[expedite]=false"
-TIME_URL = f"https://ais.usvisa-info.com/{EMBASSY}/niv/schedule/{SCHEDULE_ID}/appointment/times/{FACILITY_ID}.json?date=%s&appointments[expedite]=false"
-SIGN_OUT_LINK = f"https://ais.usvisa-info.com/{EMBASSY}/niv/users/sign_out"
-CAS_DATE_URL = (
-    f"https://ais.usvisa-info.com/{EMBASSY}/niv/schedule/{SCHEDULE_ID}/appointment/days/{CAS_FACILITY_ID}.json?&consulate_id={FACILITY_ID}"
-    "&consulate_date=%s&consulate_time=%s&appointments[expedite]=false"
-)
-CAS_TIME_URL = (
-    f"https://ais.usvisa-info.com/{EMBASSY}/niv/schedule/{SCHEDULE_ID}/appointment/times/{CAS_FACILITY_ID}.json?"
-    "date=%s"
-    f"&consulate_id={FACILITY_ID}&"
-    "consulate_date=%s&consulate_time=%s&appointments[expedite]=false"
-)
+SIGN_IN_LINK = SETTINGS.sign_in_link
+APPOINTMENT_URL = SETTINGS.appointment_url
+SIGN_OUT_LINK = SETTINGS.sign_out_link
+# JSON endpoints of each facility, and those of the first one
+FACILITY_URLS = SETTINGS.facility_urls
+DATE_URL, TIME_URL, CAS_DATE_URL, CAS_TIME_URL = FACILITY_URLS[FACILITIES[0]]
 
 JS_SCRIPT = (
     "var req = new XMLHttpRequest();"
@@ -103,18 +142,75 @@ JS_SCRIPT = (
     "return req.responseText;"
 )
 
-# Log File for current date
-LOG_FILE_NAME = "logs/" + "log_" + str(datetime.now().date()) + ".log"
+# Log files: one per day (logs/log_YYYY-MM-DD.log), rotated when they reach LOG_MAX_BYTES.
+# Closed files are compressed with gzip
+LOG_DIR = "logs"
+LOG_MAX_BYTES = 50 * 1024 * 1024
+# JSON lines are written off the main thread, so logging never waits for the disk
+LOG_WRITER = BufferedLogWriter(LOG_DIR, LOG_MAX_BYTES)
+atexit.register(LOG_WRITER.close)
+
+# Last answer of the days endpoint of each facility, to react only to the dates that appear
+AVAILABLE_DATES = {facility: AvailableDates() for facility in FACILITIES}
+# Every availability check and the dates that appeared or disappeared since the previous one.
+# Report: python history.py --facility <CONSULATE_ID>
+HISTORY_DB = f"{LOG_DIR}/history.db"
+HISTORY = SlotHistory(HISTORY_DB)
+# Days of history used to learn the hours when new dates are usually released
+RELEASE_HISTORY_DAYS = 28
+
+# Wait between availability checks, adapted to the server and to the release hours
+SCHEDULER = AdaptivePollScheduler(
+    SETTINGS.retry_time_l_bound,
+    SETTINGS.retry_time_u_bound,
+    SETTINGS.max_requests_per_hour,
+)
 
-# Audio file name for Google Text-to-Speech
-AUDIO_FILENAME = "google_voice.mp3"
+# Cache of the Google Text-to-Speech clips, evicting the least recently played ones
+VOICE_CACHE_DIR = SETTINGS.voice_cache_dir
+VOICE_CACHE_MAX_MB = SETTINGS.voice_cache_max_mb
+# Synthesize the fixed alert messages at startup so they can be played without network
+VOICE_WARM_UP = SETTINGS.voice_warm_up
+VOICE_CACHE = VoiceCache(VOICE_CACHE_DIR, int(VOICE_CACHE_MAX_MB * 1024 * 1024))
+# Seconds to wait, before exiting, for the alerts still being played
+AUDIO_EXIT_TIMEOUT = 60
+# Fixed alert messages
+MSG_LOGIN_WRONG_CREDENTIALS = (
+    "Credenciales incorrectas. Por favor corregirlas e intentar nuevamente."
+)
+MSG_TIME_ERROR = "Error al obtener hora para reagendar cita"
+MSG_FORM_ERROR = "Error al cargar el formulario para reagendar cita"
+MSG_CAS_DATE_ERROR = "Error al obtener fecha CAS para reagendar cita"
+MSG_CAS_TIME_ERROR = "Error al obtener hora CAS para reagendar cita"
+MSG_DRIVER_ERROR = "Falló la carga del Web Driver de Google Chrome"
+MSG_EXECUTION_ERROR = "Falló la ejecución"
+STATIC_VOICE_MESSAGES = (
+    MSG_LOGIN_WRONG_CREDENTIALS,
+    MSG_TIME_ERROR,
+    MSG_FORM_ERROR,
+    MSG_CAS_DATE_ERROR,
+    MSG_CAS_TIME_ERROR,
+    MSG_DRIVER_ERROR,
+    MSG_EXECUTION_ERROR,
+)
 
 # Attempts to connect to the server
 REQUEST_ATTEMPTS = 5
+# Retry policy of each endpoint: attempts, jittered exponential backoff (seconds) and circuit
+# breaker (consecutive failed calls that open it, and seconds it stays open)
+RETRY_POLICIES = {
+    "consulate_time": RetryPolicy(REQUEST_ATTEMPTS, 0.25, 2, 3, 2 * MINUTE),
+    "cas_date": RetryPolicy(REQUEST_ATTEMPTS, 0.25, 2, 3, 2 * MINUTE),
+    "cas_time": RetryPolicy(REQUEST_ATTEMPTS, 0.25, 2, 3, 2 * MINUTE),
+    "login": RetryPolicy(REQUEST_ATTEMPTS, 2, 30, 2, 10 * MINUTE),
+}
 
 # Timeout requests
 TIMEOUT_REQUEST = 10
 
+# Attempts after a failed notification delivery, per channel
+NOTIFICATION_RETRIES = 2
+
 # Success messages patterns to check if the appointment was scheduled
 SUCCESS_PATTERNS = [
     "Successfully Scheduled",
@@ -123,6 +219,95 @@ SUCCESS_PATTERNS = [
 
 # Variable to store the chrome driver instance
 DRIVER = None
+# Errors of an element that is still being covered, animated or replaced: retried while waiting
+INTERACTION_ERRORS = (
+    ElementClickInterceptedException,
+    ElementNotInteractableException,
+    StaleElementReferenceException,
+)
+# Active browser (DRIVER) and warm standby
+DRIVER_MANAGER = DriverManager(lambda: create_chrome_driver(), standby=WARM_STANDBY)  # noqa: PLW0108
+# URL patterns not downloaded in low-footprint mode, by BLOCK_RESOURCES name
+BLOCKED_URL_PATTERNS = {
+    "images": ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.webp", "*.ico"],
+    "fonts": ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"],
+    "css": ["*.css"],
+}
+# time.monotonic() of the last browser resource check
+LAST_RESOURCE_CHECK = 0.0
+
+# Pooled keep-alive HTTP session used when HTTP_POLLING is enabled
+HTTP_SESSION = None
+
+# Background notification dispatcher, created with the first notification
+NOTIFIER = None
+
+# Background player of the spoken alerts
+AUDIO_PLAYER = AudioPlayer(
+    VOICE_CACHE,
+    # The lambdas defer the lookup of _play_clip and _log_voice_error, defined below
+    play=lambda path: _play_clip(path),  # noqa: PLW0108
+    on_error=lambda message, error: _log_voice_error(message, error),  # noqa: PLW0108
+)
+
+# Hidden fields of the appointment form and browser user agent, prefetched after login so the
+# booking POST does not have to wait for them
+APPOINTMENT_FORM_FIELDS = (
+    "authenticity_token",
+    "confirmed_limit_message",
+    "use_consulate_appointment_capacity",
+)
+APPOINTMENT_FORM = {}
+USER_AGENT = None
+# Reads every field of APPOINTMENT_FORM_FIELDS (the argument) in one round trip. Missing
+# fields are null
+READ_FORM_SCRIPT = """
+const form = {};
+for (const name of arguments[0]) {
+    const field = document.getElementsByName(name)[0];
+    form[name] = field ? field.value : null;
+}
+return form;
+"""
+
+
+class SessionExpiredError(Exception):
+    """Raised when the server no longer accepts the _yatri_session cookie."""
+
+
+class NoAcceptableTimeError(Exception):
+    """Raised when every consulate time of a date is outside EARLIEST_TIME - LATEST_TIME."""
+
+
+class Combination(NamedTuple):
+    """Consulate time and CAS date and time of a booking, as given by the server."""
+
+    consulate_time: str
+    # None if they could not be found
+    cas_date: str | None = None
+    cas_time: str | None = None
+
+
+def _log_retry(endpoint: str, attempt: int, error: Exception, delay: float) -> None:
+    msg = (
+        f"Attempt {attempt} of {RETRY_POLICIES[endpoint].attempts} of {endpoint} failed. "
+        f"Error: {error}. Retrying in {delay:.2f} s"
+    )
+    print(msg)
+    info_logger(msg)
+
+
+# Retrier of each endpoint of RETRY_POLICIES. An expired session is never retried: the caller
+# renews it. Neither is a date without acceptable times, which is skipped
+RETRIERS = {
+    endpoint: Retrier(
+        endpoint,
+        policy,
+        fatal_errors=(SessionExpiredError, NoAcceptableTimeError),
+        on_retry=_log_retry,
+    )
+    for endpoint, policy in RETRY_POLICIES.items()
+}
 
 
 def set_spanish_locale() -> None:
@@ -141,191 +326,554 @@ def set_spanish_locale() -> None:
                 )
 
 
-def send_notification(title: str, msg: str) -> None:
+def _send_sendgrid(_title: str, msg: str, timeout: float) -> None:
+    from sendgrid import SendGridAPIClient  # noqa: PLC0415
+    from sendgrid.helpers.mail import Mail  # noqa: PLC0415
+
+    message = Mail(from_email=USERNAME, to_emails=USERNAME, subject=msg, html_content=msg)
+    sg = SendGridAPIClient(SETTINGS.sendgrid_api_key)
+    sg.client.timeout = timeout
+    sg.send(message)
+
+
+def _send_pushover(_title: str, msg: str, timeout: float) -> None:
+    url = "https://api.pushover.net/1/messages.json"
+    data = {
+        "token": SETTINGS.pushover_token,
+        "user": SETTINGS.pushover_user,
+        "message": msg,
+    }
+    requests.post(url, data, timeout=timeout).raise_for_status()
+
+
+def _send_personal_site(title: str, msg: str, timeout: float) -> None:
+    url = SETTINGS.personal_pusher_url
+    data = {
+        "title": "VISA - " + str(title),
+        "user": SETTINGS.personal_site_user,
+        "pass": SETTINGS.personal_site_pass,
+        "email": SETTINGS.push_target_email,
+        "msg": msg,
+    }
+    requests.post(url, data, timeout=timeout).raise_for_status()
+
+
+def _log_notification_report(title: str, report: list[dict]) -> None:
+    deliveries = []
+    for delivery in report:
+        metrics.observe(f"notification.{delivery['channel']}", delivery["seconds"])
+        status = "ok" if delivery["ok"] else f"failed ({delivery['error']})"
+        deliveries.append(
+            f"{delivery['channel']}={status} after {delivery['attempts']} attempt(s) "
+            f"in {delivery['seconds']:.2f} s",
+        )
+    msg = f"Notification {title} delivery report: " + ", ".join(deliveries)
+    print(msg)
+    info_logger(msg)
+
+
+def setup_notification_channels() -> NotificationDispatcher:
+    """Create the notification dispatcher with the channels available in the configuration.
+
+    Returns:
+        NotificationDispatcher: The dispatcher stored in NOTIFIER.
+
+    """
+    dispatcher = NotificationDispatcher(on_report=_log_notification_report)
+    if SETTINGS.sendgrid_api_key:
+        dispatcher.add_channel("sendgrid", _send_sendgrid, TIMEOUT_REQUEST, NOTIFICATION_RETRIES)
+    if SETTINGS.pushover_token:
+        dispatcher.add_channel("pushover", _send_pushover, TIMEOUT_REQUEST, NOTIFICATION_RETRIES)
+    if SETTINGS.personal_site_user:
+        dispatcher.add_channel(
+            "personal_site",
+            _send_personal_site,
+            TIMEOUT_REQUEST,
+            NOTIFICATION_RETRIES,
+        )
+    return dispatcher
+
+
+@metrics.timed("send_notification")
+def send_notification(title: str, msg: str) -> Future:
     """Send notification using various methods based on available configurations.
 
+    The channels are delivered concurrently in background threads; this function does not wait
+    for them. The delivery report is logged when all of them finish.
+
     Args:
         title (str): The title of the notification.
         msg (str): The message content of the notification.
 
     Returns:
-        None
+        Future: Resolves to the delivery report of each channel.
 
     """
-    if SENDGRID_API_KEY:
-        message = Mail(from_email=USERNAME, to_emails=USERNAME, subject=msg, html_content=msg)
-        try:
-            sg = SendGridAPIClient(SENDGRID_API_KEY)
-            response = sg.send(message)
-            print(response.status_code)
-            print(response.body)
-            print(response.headers)
+    global NOTIFIER  # noqa: PLW0603
 
-        except Exception as e:
-            print(e.message)
-
-    if PUSHOVER_TOKEN:
-        url = "https://api.pushover.net/1/messages.json"
-        data = {
-            "token": PUSHOVER_TOKEN,
-            "user": PUSHOVER_USER,
-            "message": msg,
-        }
-        requests.post(url, data, timeout=TIMEOUT_REQUEST)
-    if PERSONAL_SITE_USER:
-        url = PERSONAL_PUSHER_URL
-        data = {
-            "title": "VISA - " + str(title),
-            "user": PERSONAL_SITE_USER,
-            "pass": PERSONAL_SITE_PASS,
-            "email": PUSH_TARGET_EMAIL,
-            "msg": msg,
-        }
-        requests.post(url, data, timeout=TIMEOUT_REQUEST)
-
-
-def auto_action(  # noqa: PLR0913
+    if NOTIFIER is None:
+        NOTIFIER = setup_notification_channels()
+    return NOTIFIER.dispatch(title, msg)
+
+
+def wait_for(condition: Callable, timeout: float = PAGE_TIMEOUT) -> object:
+    """Wait until a condition on the browser is met.
+
+    Args:
+        condition (Callable): Function (driver) -> value, met when the value is truthy.
+        timeout (float, optional): Maximum wait in seconds. Defaults to PAGE_TIMEOUT.
+
+    Returns:
+        object: The value returned by the condition.
+
+    Raises:
+        TimeoutException: If the condition is not met in time.
+
+    """
+    from selenium.webdriver.support.ui import WebDriverWait  # noqa: PLC0415
+
+    return WebDriverWait(
+        DRIVER,
+        timeout,
+        poll_frequency=WAIT_POLL_FREQUENCY,
+        ignored_exceptions=INTERACTION_ERRORS,
+    ).until(condition)
+
+
+def page_is_idle(driver: "webdriver.Chrome | webdriver.Remote") -> bool:
+    """Return whether the page finished loading and has no AJAX request in flight.
+
+    Args:
+        driver (webdriver.Chrome | webdriver.Remote): The driver.
+
+    Returns:
+        bool: True if the page is loaded and idle.
+
+    """
+    return driver.execute_script(
+        "return document.readyState === 'complete'"
+        " && (typeof jQuery === 'undefined' || jQuery.active === 0);",
+    )
+
+
+@metrics.timed("auto_action")
+def auto_action(
     label: str,
-    find_by: str,
-    element_type: str,
+    locator: tuple[str, str],
     action: str,
-    value: str,
-    sleep_time: float = 0,
+    value: str = "",
+    timeout: float = STEP_TIMEOUT,
 ) -> None:
-    """Perform an automated action on a web element.
+    """Perform an automated action on a web element as soon as it is ready.
+
+    The element is waited for until it is visible (to send keys) or clickable (to click). An
+    action failing because the element is still covered or being replaced is retried.
 
     Args:
         label (str): Label for the action being performed.
-        find_by (str): Method to find the element (id, name, class, xpath).
-        element_type (str): Identifier for the element.
+        locator (tuple[str, str]): Strategy and value to find the element, e.g. LOCATORS["email"].
         action (str): Action to perform (send, click).
-        value (str): Value to send if action is "send".
-        sleep_time (float, optional): Time to sleep after action. Defaults to 0.
+        value (str, optional): Value to send if action is "send". Defaults to "".
+        timeout (float, optional): Maximum wait for the element. Defaults to STEP_TIMEOUT.
 
     Returns:
         None
 
+    Raises:
+        TimeoutException: If the element is not ready in time.
+
     """
-    print("\t" + label + ":", end="")
+    from selenium.webdriver.support import expected_conditions  # noqa: PLC0415
 
-    # Find Element By
-    match find_by.lower():
-        case "id":
-            item = DRIVER.find_element(By.ID, element_type)
-        case "name":
-            item = DRIVER.find_element(By.NAME, element_type)
-        case "class":
-            item = DRIVER.find_element(By.CLASS_NAME, element_type)
-        case "xpath":
-            item = DRIVER.find_element(By.XPATH, element_type)
-        case _:
-            return
+    print("\t" + label + ":", end="")
 
-    # Do Action:
+    # Wait for the element to be ready for the action
     match action.lower():
         case "send":
-            item.send_keys(value)
+            ready = expected_conditions.visibility_of_element_located(locator)
         case "click":
-            item.click()
+            ready = expected_conditions.element_to_be_clickable(locator)
         case _:
             return
 
+    def perform(driver: "webdriver.Chrome | webdriver.Remote") -> bool:
+        item = ready(driver)
+        if not item:
+            return False
+        if action.lower() == "send":
+            item.send_keys(value)
+        else:
+            item.click()
+        return True
+
+    wait_for(perform, timeout)
     print("\t\tCheck!")
-    if sleep_time:
-        time.sleep(sleep_time)
 
 
-def create_logging_file_path_if_does_not_exist() -> None:
-    """Create the directory path for the logging file if it doesn't exist.
+def sync_http_session() -> requests.Session:
+    """Copy the browser session cookie and user agent into a pooled requests session.
+
+    The session keeps the connection to the server alive between polls, so each check only
+    costs one HTTP round trip instead of a WebDriver command plus a synchronous XHR in Chrome.
 
     Returns:
-        None
+        requests.Session: The session stored in HTTP_SESSION.
+
+    """
+    global HTTP_SESSION  # noqa: PLW0603
+
+    session = requests.Session()
+    # One connection per facility polled concurrently
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=max(4, len(FACILITIES)),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(
+        {
+            "User-Agent": DRIVER.execute_script("return navigator.userAgent;"),
+            "Accept": "application/json, text/javascript, */*; q=0.01",
+            "X-Requested-With": "XMLHttpRequest",
+            "Referer": APPOINTMENT_URL,
+        },
+    )
+    cookie = DRIVER.get_cookie("_yatri_session")
+    session.cookies.set(
+        "_yatri_session",
+        cookie["value"],
+        domain=cookie.get("domain", ""),
+        path=cookie.get("path", "/"),
+    )
+
+    if HTTP_SESSION is not None:
+        HTTP_SESSION.close()
+    HTTP_SESSION = session
+    return session
+
+
+def fetch_raw(url: str) -> bytes | str:
+    """Request an endpoint of the appointment system without decoding the answer.
+
+    When HTTP_POLLING is enabled the request goes through HTTP_SESSION, otherwise it is sent as
+    a synchronous XMLHttpRequest executed inside Chrome.
+
+    Args:
+        url (str): The URL of the endpoint.
+
+    Returns:
+        bytes | str: The body of the response (str when it comes from Chrome).
+
+    Raises:
+        SessionExpiredError: If the server redirects to the sign in page or answers 401.
+
+    """
+    if HTTP_POLLING and HTTP_SESSION is not None:
+        response = HTTP_SESSION.get(url, timeout=TIMEOUT_REQUEST)
+        if response.status_code == HTTPStatus.UNAUTHORIZED or "/users/sign_in" in response.url:
+            msg = f"Session cookie expired while requesting {url}"
+            raise SessionExpiredError(msg)
+        response.raise_for_status()
+        return response.content
+
+    session = DRIVER.get_cookie("_yatri_session")["value"]
+    script = JS_SCRIPT % (str(url), session)
+    return DRIVER.execute_script(script)
+
+
+@metrics.timed("fetch_json")
+def fetch_json(url: str) -> dict | list:
+    """Request a JSON endpoint of the appointment system.
+
+    Args:
+        url (str): The URL of the JSON endpoint.
+
+    Returns:
+        dict | list: The decoded JSON response.
+
+    Raises:
+        SessionExpiredError: If the server redirects to the sign in page or answers 401.
+
+    """
+    return json.loads(fetch_raw(url))
+
+
+def measure_stage(
+    timings: dict,
+    stage: str,
+    func: Callable,
+    *args: object,
+    **kwargs: object,
+) -> object:
+    """Call a function and store how long it took.
+
+    Args:
+        timings (dict): Dictionary where the duration (seconds) is stored under `stage`.
+        stage (str): Name of the stage being measured.
+        func (Callable): Function to call.
+        *args: Positional arguments for `func`.
+        **kwargs: Keyword arguments for `func`.
+
+    Returns:
+        object: The value returned by `func`.
+
+    """
+    start = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        timings[stage] = time.perf_counter() - start
+
+
+def log_stage_timings(label: str, timings: dict) -> None:
+    """Log the duration of each measured stage in milliseconds.
+
+    Args:
+        label (str): Name of the measured process.
+        timings (dict): Stage durations in seconds.
+
+    """
+    for stage, duration in timings.items():
+        metrics.observe(f"{label.lower()}.{stage}", duration)
+
+    msg = f"{label} timings (ms): " + ", ".join(
+        f"{stage}={duration * 1000:.0f}" for stage, duration in timings.items()
+    )
+    print(msg)
+    info_logger(msg)
+
+
+def read_appointment_form() -> dict:
+    """Read the hidden fields of the appointment form in the current page.
+
+    Returns:
+        dict: The value of each field in APPOINTMENT_FORM_FIELDS.
+
+    Raises:
+        ValueError: If a field is not in the page.
+
+    """
+    form = DRIVER.execute_script(READ_FORM_SCRIPT, list(APPOINTMENT_FORM_FIELDS))
+    missing = [name for name in APPOINTMENT_FORM_FIELDS if form.get(name) is None]
+    if missing:
+        msg = f"Fields {missing} not found in the appointment form"
+        raise ValueError(msg)
+    return form
+
+
+def load_appointment_form(*, navigate: bool = True) -> dict:
+    """Load APPOINTMENT_URL in the browser and refresh the cached appointment form fields.
+
+    Args:
+        navigate (bool): False if the browser is already on APPOINTMENT_URL.
+
+    Returns:
+        dict: The hidden form fields. If the page could not be read, the last cached fields
+        (empty if there are none).
+
+    """
+    try:
+        if navigate:
+            DRIVER.get(APPOINTMENT_URL)
+        APPOINTMENT_FORM.update(read_appointment_form())
+    except Exception as e:
+        msg = f"Error loading the appointment form, using the cached fields. Error: {e}"
+        print(msg)
+        info_logger(msg)
+    return dict(APPOINTMENT_FORM)
+
+
+def prefetch_booking_data(*, navigate: bool = True) -> None:
+    """Cache the browser user agent and the appointment form fields right after login.
+
+    Args:
+        navigate (bool): False if the browser is already on APPOINTMENT_URL.
 
     """
+    global USER_AGENT  # noqa: PLW0603
+
+    USER_AGENT = DRIVER.execute_script("return navigator.userAgent;")
+    load_appointment_form(navigate=navigate)
+
+
+def save_session() -> None:
+    """Save the browser cookies in SESSION_FILE if the session is kept between runs."""
+    if not KEEP_SESSION:
+        return
     try:
-        directory = Path(LOG_FILE_NAME).parent  # Create the directory path if it doesn't exist
-        if directory != Path():  # Avoid unnecessary mkdir for the current directory
-            directory.mkdir(parents=True, exist_ok=True)
-
-    except PermissionError:
-        print("Permission denied while creating logging directory: %s", directory)
-    except OSError as e:
-        print("Failed to create logging directory: %s - Error: %s", directory, e)
+        save_cookies(DRIVER.get_cookies(), SESSION_FILE)
     except Exception as e:
-        print("An error occurred while creating logging directory: %s", e)
+        msg = f"Could not save the session cookies in {SESSION_FILE}. Error: {e}"
+        print(msg)
+        info_logger(msg)
+
+
+def restore_session_cookies() -> bool:
+    """Add the cookies saved in SESSION_FILE to the browser.
+
+    Returns:
+        bool: True if a session cookie was restored.
+
+    """
+    cookies = load_cookies(SESSION_FILE, SETTINGS.session_max_age * HOUR)
+    if not any(cookie.get("name") == "_yatri_session" for cookie in cookies):
+        return False
+    # Cookies can only be added to the domain of the current page
+    DRIVER.get(f"{BASE_URL}/robots.txt")
+    for cookie in cookies:
+        DRIVER.add_cookie(cookie)
+    return True
+
+
+def session_is_valid() -> bool:
+    """Check with a single request whether the browser session is still logged in.
+
+    With HTTP polling the appointment page is requested over HTTP without following redirects.
+    Otherwise the browser loads it, and the page is kept to read the form from it.
+
+    Returns:
+        bool: False if the server sends the request to the sign in page.
+
+    """
+    if HTTP_POLLING:
+        sync_http_session()
+        response = HTTP_SESSION.get(
+            APPOINTMENT_URL,
+            allow_redirects=False,
+            timeout=TIMEOUT_REQUEST,
+        )
+        return response.status_code == HTTPStatus.OK
+    DRIVER.get(APPOINTMENT_URL)
+    return "/users/sign_in" not in DRIVER.current_url
+
+
+@metrics.timed("resume_session")
+def resume_session() -> bool:
+    """Reuse the session of the browser, or the one saved in SESSION_FILE, instead of logging in.
+
+    Returns:
+        bool: True if the session is still valid and ready to poll.
+
+    """
+    if not KEEP_SESSION:
+        return False
+    try:
+        if DRIVER.get_cookie("_yatri_session") is None and not restore_session_cookies():
+            return False
+        if not session_is_valid():
+            msg = "The saved session has expired. Logging in again."
+            print(msg)
+            info_logger(msg)
+            delete_cookies(SESSION_FILE)
+            return False
+        if not APPOINTMENT_FORM:
+            prefetch_booking_data(navigate=HTTP_POLLING)
+    except Exception as e:
+        msg = f"Could not resume the session. Error: {e}"
+        print(msg)
+        info_logger(msg)
+        return False
 
+    print("\n\tSession resumed without logging in!\n")
+    save_session()
+    return True
 
+
+def login_result(driver: "webdriver.Chrome | webdriver.Remote") -> str | None:
+    """Look for the link shown after logging in, or the wrong credentials message.
+
+    Args:
+        driver (webdriver.Chrome | webdriver.Remote): The driver.
+
+    Returns:
+        str | None: "continue" or "wrong_credentials", None while the login is processed.
+
+    """
+    if driver.find_elements(*CONTINUE_LOCATOR):
+        return "continue"
+    if driver.find_elements(*WRONG_CREDENTIALS_LOCATOR):
+        return "wrong_credentials"
+    return None
+
+
+@metrics.timed("start_login_process")
 def start_login_process() -> bool:
     """Initiate the login process, attempting to bypass reCAPTCHA and log in to the system.
 
-    This function creates a logging file path if it doesn't exist, then attempts to log in
-    up to LOGIN_ATTEMPTS times. It performs various actions such as entering credentials, accepting
-    privacy terms, and navigating through the login process. If successful, it prints a
-    success message. If it fails, it logs the error and retries.
+    The login is attempted following the "login" policy of RETRY_POLICIES. Each attempt enters
+    the credentials, accepts the privacy terms and submits the form, waiting for every element
+    to be ready instead of sleeping. Wrong credentials are not retried.
 
     Returns:
         bool: True if login is successful, False otherwise.
 
     """
-    create_logging_file_path_if_does_not_exist()
+    try:
+        return RETRIERS["login"].call(_login_attempt)
+    except Exception as e:
+        msg = f"login failed! Error: {e}\n"
+        print(msg)
+        info_logger(msg)
+        return False
 
-    attempts = 0
-    while attempts < REQUEST_ATTEMPTS:
-        try:
-            attempts += 1
-            DRIVER.get(SIGN_IN_LINK)
-            time.sleep(STEP_TIME)
-            WebDriverWait(DRIVER, 30).until(
-                expected_conditions.presence_of_element_located((By.NAME, "commit")),
-            )
-            auto_action(
-                "Click bounce",
-                "xpath",
-                '//a[@class="down-arrow bounce"]',
-                "click",
-                "",
-                STEP_TIME,
-            )
-            auto_action("Email", "id", "user_email", "send", USERNAME, STEP_TIME)
-            auto_action("Password", "id", "user_password", "send", PASSWORD, STEP_TIME)
-            auto_action("Privacy", "class", "icheckbox", "click", "", STEP_TIME)
-            auto_action("Enter Panel", "name", "commit", "click", "", STEP_TIME)
-            time.sleep(STEP_TIME)
-            WebDriverWait(DRIVER, 30).until(
-                lambda driver: (
-                    driver.find_elements(By.XPATH, f"//a[contains(text(), '{REGEX_CONTINUE}')]")
-                    or driver.find_elements(
-                        By.XPATH,
-                        f"//*[contains(text(), '{REGEX_WRONG_CREDENTIALS}')]",
-                    )
-                ),
-            )
-            # Verificar si apareció el mensaje de error
-            if DRIVER.find_elements(
-                By.XPATH,
-                f"//*[contains(text(), '{REGEX_WRONG_CREDENTIALS}')]",
-            ):
-                _handle_notification(
-                    "EXCEPTION",
-                    "Credenciales incorrectas. Por favor corregirlas e intentar nuevamente.",
-                )
-                return False
 
-            print("\n\tLogin successful!\n")
-            return True
+def _login_attempt() -> bool:
+    """Log in once, logging the duration of every step.
 
-        except Exception as e:
-            msg = f"login failed! Error: {e}\n"
-            print(msg)
-            info_logger(msg)
-            time.sleep(STEP_TIME)
+    Returns:
+        bool: True if login is successful, False if the credentials are wrong.
 
-    return False
+    Raises:
+        Exception: Any error of the browser, so the attempt is retried.
+
+    """
+    timings = {}
+    try:
+        measure_stage(timings, "load", DRIVER.get, SIGN_IN_LINK)
+        measure_stage(timings, "idle", wait_for, page_is_idle)
+        for stage, label, action, value in (
+            ("bounce", "Click bounce", "click", ""),
+            ("email", "Email", "send", USERNAME),
+            ("password", "Password", "send", PASSWORD),
+            ("privacy", "Privacy", "click", ""),
+            ("submit", "Enter Panel", "click", ""),
+        ):
+            measure_stage(timings, stage, auto_action, label, LOCATORS[stage], action, value)
+        result = measure_stage(timings, "result", wait_for, login_result)
+        # Verificar si apareció el mensaje de error
+        if result == "wrong_credentials":
+            _handle_notification("EXCEPTION", MSG_LOGIN_WRONG_CREDENTIALS)
+            return False
+
+        print("\n\tLogin successful!\n")
+        if HTTP_POLLING:
+            sync_http_session()
+        measure_stage(timings, "prefetch", prefetch_booking_data)
+        save_session()
+        return True
+    finally:
+        log_stage_timings("Login", timings)
+
+
+def _play_clip(path: str) -> None:
+    from playsound import playsound  # noqa: PLC0415
+
+    playsound(path, block=True)
+
+
+def _log_voice_error(message: str, error: Exception) -> None:
+    msg = f"Could not play the voice message '{message}'. Error: {error}"
+    print(msg)
+    info_logger(msg)
 
 
 def str_to_google_voice(message: str) -> None:
     """Convert a string to a Google voice message.
 
+    The message is queued in AUDIO_PLAYER, which plays it from VOICE_CACHE in a background
+    thread, so this function returns immediately. A message already waiting is not queued
+    twice. If the Text-to-Speech service or the audio output fail, the error is logged.
+
     Args:
         message (str): Text to convert to voice.
 
@@ -333,184 +881,363 @@ def str_to_google_voice(message: str) -> None:
         None
 
     """
-    # Create a gTTS object with the message and set the language to Spanish
-    tts = gTTS(text=message, lang="es", tld="com.mx", slow=False)
-
-    # Save the audio and play it
-    tts.save(AUDIO_FILENAME)
-    playsound(f"./{AUDIO_FILENAME}", block=True)
+    AUDIO_PLAYER.say(message)
 
 
-def get_cas_date(consulate_date: str, consulate_time: str) -> str | bool:
+@metrics.timed("get_cas_date")
+def get_cas_date(
+    consulate_date: str,
+    consulate_time: str,
+    facility: Facility = FACILITIES[0],
+) -> str | bool:
     """Attempt to retrieve a CAS date based on the provided consulate date and time.
 
     Args:
         consulate_date (str): The date of the consulate appointment.
         consulate_time (str): The time of the consulate appointment.
+        facility (Facility, optional): The facility of the appointment. Defaults to the first.
 
     Returns:
         str | bool: The selected CAS date if available, or False if no date could be retrieved.
 
-    """
-    cas_date_url = CAS_DATE_URL % (consulate_date, consulate_time)
-    for attempt in range(1, REQUEST_ATTEMPTS + 1):
-        try:
-            print(f"Attempt {attempt} of {REQUEST_ATTEMPTS} to get CAS date")
-            session = DRIVER.get_cookie("_yatri_session")["value"]
-            script = JS_SCRIPT % (str(cas_date_url), session)
-            content = DRIVER.execute_script(script)
-            json_data = json.loads(content)
-            dates = [item["date"] for item in json_data if item.get("business_day")]
-            if dates:
-                print("CAS Available Dates:", ", ".join(dates))
-                cas_date = dates[-1]
-                print("Selected CAS Date:", cas_date)
-                return cas_date
-            print("No available CAS dates found.")
+    """
+    cas_date_url = FACILITY_URLS[facility].cas_days % (consulate_date, consulate_time)
+
+    def attempt() -> str | bool:
+        json_data = fetch_json(cas_date_url)
+        dates = [item["date"] for item in json_data if item.get("business_day")]
+        if not dates:
+            print("No available CAS dates found.")
+            return False
+        print("CAS Available Dates:", ", ".join(dates))
+        slot = Slot(consulate_date, to_minutes(consulate_time), facility=facility.consulate_id)
+        cas_date = SETTINGS.slot_ranker.rank_options(slot, "cas_date", dates)[0]
+        print("Selected CAS Date:", cas_date)
+        return cas_date
+
+    try:
+        return RETRIERS["cas_date"].call(attempt)
+    except SessionExpiredError:
+        raise
+    except Exception as e:
+        msg = (
+            f"Error to get cas date for consulate_date={consulate_date} and "
+            f"consulate_time={consulate_time} in method get_cas_date(). Error: {e}"
+        )
+        print(msg)
+        info_logger(msg)
+        return False
+
+
+@metrics.timed("get_cas_time")
+def get_cas_time(
+    consulate_date: str,
+    consulate_time: str,
+    cas_date: str,
+    facility: Facility = FACILITIES[0],
+) -> str | bool:
+    """Get the CAS time for the given consulate date, time, and CAS date.
+
+    Args:
+        consulate_date (str): The consulate appointment date.
+        consulate_time (str): The consulate appointment time.
+        cas_date (str): The CAS date.
+        facility (Facility, optional): The facility of the appointment. Defaults to the first.
+
+    Returns:
+        str | bool: The best ranked available CAS time if found, False otherwise.
+
+    """
+    cas_time_url = FACILITY_URLS[facility].cas_times % (cas_date, consulate_date, consulate_time)
+    print(f"CAS_TIME_URL: {cas_time_url}")
+
+    def attempt() -> str | bool:
+        json_data = fetch_json(cas_time_url)
+        available_times = json_data.get("available_times")
+        if not available_times:
+            print("No available CAS times found.")
+            return False
+        print("CAS Available Times:", ", ".join(available_times))
+        slot = Slot(
+            consulate_date,
+            to_minutes(consulate_time),
+            cas_date,
+            facility=facility.consulate_id,
+        )
+        cas_time = SETTINGS.slot_ranker.rank_options(slot, "cas_time", available_times)[0]
+        print("Selected CAS Time:", cas_time)
+        return cas_time
+
+    try:
+        return RETRIERS["cas_time"].call(attempt)
+    except SessionExpiredError:
+        raise
+    except Exception as e:
+        msg = (
+            f"Error to get cas time for cas_date={cas_date}, consulate_date={consulate_date}, "
+            f"consulate_time={consulate_time} in method get_cas_time(). Error: {e}"
+        )
+        print(msg)
+        info_logger(msg)
+        return False
+
+
+def _handle_notification(msg_title: str, msg: str) -> None:
+    print(msg)
+    info_logger(msg)
+    send_notification(msg_title, msg)
+    str_to_google_voice(msg)
+
+
+def build_reschedule_data(  # noqa: PLR0913
+    form: dict,
+    date: str,
+    consulate_time: str,
+    cas_date: str,
+    cas_time: str,
+    *,
+    facility: Facility = FACILITIES[0],
+) -> dict:
+    """Build the form data of the reschedule POST.
+
+    Args:
+        form (dict): Hidden fields of the appointment form.
+        date (str): The consulate appointment date.
+        consulate_time (str): The consulate appointment time.
+        cas_date (str): The CAS appointment date.
+        cas_time (str): The CAS appointment time.
+        facility (Facility, optional): The facility of the appointment. Defaults to the first.
+
+    Returns:
+        dict: The fields to send to APPOINTMENT_URL.
+
+    """
+    return {
+        **form,
+        "appointments[consulate_appointment][facility_id]": facility.consulate_id,
+        "appointments[consulate_appointment][date]": date,
+        "appointments[consulate_appointment][time]": consulate_time,
+        "appointments[asc_appointment][facility_id]": facility.cas_id,
+        "appointments[asc_appointment][date]": cas_date,
+        "appointments[asc_appointment][time]": cas_time,
+    }
+
+
+@metrics.timed("reschedule")
+def reschedule(date: str, facility: Facility = FACILITIES[0]) -> bool:
+    """Reschedule a consulate appointment for the given date.
+
+    Args:
+        date (str): The date to reschedule the appointment for.
+        facility (Facility, optional): The facility of the date. Defaults to the first.
+
+    Returns:
+        bool: True if the appointment was successfully rescheduled, False otherwise.
+
+    Raises:
+        NoAcceptableTimeError: If no consulate time of the date is acceptable.
+
+    """
+    timings = {}
+    reschedule_start = time.perf_counter()
+    try:
+        return _reschedule(date, facility, timings)
+    finally:
+        # Failed attempts are timed too: they are usually the slow ones
+        timings["total"] = time.perf_counter() - reschedule_start
+        log_stage_timings("Reschedule", timings)
+
+
+def _reschedule(date: str, facility: Facility, timings: dict) -> bool:
+    concurrent = HTTP_POLLING and HTTP_SESSION is not None
+
+    # The appointment page is reloaded in the browser while the consulate times and the CAS
+    # options are requested over the HTTP session. Without HTTP polling every step needs the
+    # driver, so they run in order and only the best consulate time is looked up.
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        if concurrent:
+            form_future = executor.submit(
+                measure_stage,
+                timings,
+                "load_form",
+                load_appointment_form,
+            )
+        else:
+            form_future = None
+            form = measure_stage(timings, "load_form", load_appointment_form)
+        consulate_times = measure_stage(
+            timings,
+            "consulate_time",
+            get_consulate_appointment_times,
+            date,
+            facility,
+        )
+        combinations = []
+        if consulate_times:
+            candidates = consulate_times[: SETTINGS.cas_candidates if concurrent else 1]
+            combinations = measure_stage(
+                timings,
+                "cas",
+                find_cas_combinations,
+                date,
+                candidates,
+                facility,
+            )
+        if form_future is not None:
+            form = form_future.result()
+
+    if not consulate_times:
+        _handle_notification("EXCEPTION", MSG_TIME_ERROR)
+        return False
+
+    if not form:
+        _handle_notification("EXCEPTION", MSG_FORM_ERROR)
+        return False
+
+    bookable = rank_combinations(date, combinations, facility)
+    if not bookable:
+        found_cas_date = any(combination.cas_date for combination in combinations)
+        msg = MSG_CAS_TIME_ERROR if found_cas_date else MSG_CAS_DATE_ERROR
+        _handle_notification("EXCEPTION", msg)
+        return False
+
+    headers = {
+        "User-Agent": USER_AGENT or DRIVER.execute_script("return navigator.userAgent;"),
+        "Referer": APPOINTMENT_URL,
+        "Cookie": "_yatri_session=" + DRIVER.get_cookie("_yatri_session")["value"],
+        "Content-Type": "application/x-www-form-urlencoded",
+    }
 
-        except Exception as e:
-            msg = (
-                f"Error to get cas date for consulate_date={consulate_date} and "
-                f"consulate_time={consulate_time} in method get_cas_date(). Error: {e}"
-            )
-            print(msg)
-            info_logger(msg)
+    # Every combination was prepared in advance: a rejected one is followed by the next POST
+    for attempt, combination in enumerate(bookable, start=1):
+        data = build_reschedule_data(form, date, *combination, facility=facility)
+        stage = "post" if attempt == 1 else f"post_{attempt}"
+        booked = measure_stage(timings, stage, post_reschedule, data, headers)
+        if booked:
+            break
 
-        print("Retrying...")
-        time.sleep(STEP_TIME)
+    appointment_readable_date = readable_date(date)
+    if booked:
+        consulate_time, cas_date, cas_time = combination
+        msg = (
+            f"¡Cita reagendada para el {appointment_readable_date} a las {consulate_time} y "
+            f"cita CAS para el {readable_date(cas_date)} a las {cas_time}!"
+        )
+        _handle_notification("SUCCESS", msg)
+        return True
 
+    # If the appointment was not successfully rescheduled, log the error message
+    times = ", ".join(combination.consulate_time for combination in bookable)
+    _handle_notification(
+        "EXCEPTION",
+        f"No se pudo reagendar la cita para la fecha {appointment_readable_date} a las {times}",
+    )
     return False
 
 
-def closest_time_to_desired_time(
-    available_hours: list,
-    desired_time: str = "10:00",
-) -> str:
-    """Given a list of available hours return the closest time to the desired time.
+def readable_date(iso_date: str) -> str:
+    """Format a date in words with the current locale, e.g. "5 de marzo de 2025".
 
     Args:
-        available_hours (list): List of available hours.
-        desired_time (str): The desired time to compare against.
+        iso_date (str): The date (YYYY-MM-DD).
 
     Returns:
-        str: The closest time to the desired time.
+        str: The readable date.
 
     """
-    # Convert the desired time to a datetime object
-    target = datetime.strptime(desired_time, "%H:%M")
-
-    # Convert each hour to a datetime object and find the closest one
-    return min(
-        available_hours,
-        key=lambda t: abs(datetime.strptime(t, "%H:%M") - target),
-    )
+    return datetime.strptime(iso_date, "%Y-%m-%d").strftime("%d de %B de %Y").lstrip("0")
 
 
-def get_cas_time(consulate_date: str, consulate_time: str, cas_date: str) -> str | bool:
-    """Get the CAS time for the given consulate date, time, and CAS date.
+def find_cas_slot(date: str, consulate_time: str, facility: Facility) -> Combination:
+    """Look up the best CAS date and then the best CAS time for a consulate slot.
 
     Args:
-        consulate_date (str): The consulate appointment date.
+        date (str): The consulate appointment date.
         consulate_time (str): The consulate appointment time.
-        cas_date (str): The CAS date.
+        facility (Facility): The facility of the appointment.
 
     Returns:
-        str | bool: The closest available CAS time if found, False otherwise.
+        Combination: The consulate time with the CAS date and time found.
 
     """
-    cas_time_url = CAS_TIME_URL % (cas_date, consulate_date, consulate_time)
-    print(f"CAS_TIME_URL: {cas_time_url}")
-    for attempt in range(1, REQUEST_ATTEMPTS + 1):
-        try:
-            print(f"Attempt {attempt} of {REQUEST_ATTEMPTS} to get CAS time")
-            session = DRIVER.get_cookie("_yatri_session")["value"]
-            script = JS_SCRIPT % (str(cas_time_url), session)
-            content = DRIVER.execute_script(script)
-            json_data = json.loads(content)
-            available_times = json_data.get("available_times")
-            if available_times:
-                print("CAS Available Times:", ", ".join(available_times))
-                closest_time = closest_time_to_desired_time(available_times)
-                print("Selected CAS Time:", closest_time)
-                return closest_time
-            print("No available CAS times found.")
-
-        except Exception as e:
-            msg = (
-                f"Error to get cas time for cas_date={cas_date}, consulate_date={consulate_date}, "
-                f"consulate_time={consulate_time} in method get_cas_date(). Error: {e}"
-            )
-            print(msg)
-            info_logger(msg)
+    cas_date = get_cas_date(date, consulate_time, facility)
+    if not cas_date:
+        return Combination(consulate_time)
+    cas_time = get_cas_time(date, consulate_time, cas_date, facility)
+    return Combination(consulate_time, cas_date, cas_time or None)
 
-        print("Retrying...")
-        time.sleep(STEP_TIME)
 
-    return False
+def find_cas_combinations(
+    date: str,
+    consulate_times: list[str],
+    facility: Facility,
+) -> list[Combination]:
+    """Look up the CAS date and time of several consulate times.
 
+    With HTTP polling the lookups run concurrently over HTTP_SESSION; the browser can only run
+    one request at a time.
 
-def _handle_notification(msg_title: str, msg: str) -> None:
-    print(msg)
-    info_logger(msg)
-    str_to_google_voice(msg)
-    send_notification(msg_title, msg)
+    Args:
+        date (str): The consulate appointment date.
+        consulate_times (list[str]): The candidate consulate times.
+        facility (Facility): The facility of the appointment.
 
+    Returns:
+        list[Combination]: One combination per consulate time, in the same order.
 
-def reschedule(date: str) -> bool:
-    """Reschedule a consulate appointment for the given date.
+    """
+    if len(consulate_times) > 1 and HTTP_POLLING and HTTP_SESSION is not None:
+        with ThreadPoolExecutor(max_workers=len(consulate_times)) as executor:
+            futures = [
+                executor.submit(find_cas_slot, date, consulate_time, facility)
+                for consulate_time in consulate_times
+            ]
+            return [future.result() for future in futures]
+    return [find_cas_slot(date, consulate_time, facility) for consulate_time in consulate_times]
+
+
+def rank_combinations(
+    date: str,
+    combinations: list[Combination],
+    facility: Facility,
+) -> list[Combination]:
+    """Sort the complete combinations from best to worst with SETTINGS.slot_ranker.
 
     Args:
-        date (str): The date to reschedule the appointment for.
+        date (str): The consulate appointment date.
+        combinations (list[Combination]): The combinations found.
+        facility (Facility): The facility of the appointment.
 
     Returns:
-        bool: True if the appointment was successfully rescheduled, False otherwise.
+        list[Combination]: The combinations with CAS date and time, best first.
 
     """
-    DRIVER.get(APPOINTMENT_URL)
-
-    time = get_consulate_appointment_time(date)
-    if not time:
-        _handle_notification("EXCEPTION", "Error al obtener hora para reagendar cita")
-        return False
+    complete = [c for c in combinations if c.cas_date and c.cas_time]
+    slots = [
+        Slot(
+            date,
+            to_minutes(c.consulate_time),
+            c.cas_date,
+            to_minutes(c.cas_time),
+            facility=facility.consulate_id,
+        )
+        for c in complete
+    ]
+    ranked = SETTINGS.slot_ranker.rank(slots)
+    return [complete[slots.index(slot)] for slot in ranked]
 
-    cas_date = get_cas_date(date, time)
-    if not cas_date:
-        _handle_notification("EXCEPTION", "Error al obtener fecha CAS para reagendar cita")
-        return False
 
-    cas_time = get_cas_time(date, time, cas_date)
-    if not cas_time:
-        _handle_notification("EXCEPTION", "Error al obtener hora CAS para reagendar cita")
-        return False
+def post_reschedule(data: dict, headers: dict) -> bool:
+    """Send the reschedule POST and log the request and the answer.
 
-    headers = {
-        "User-Agent": DRIVER.execute_script("return navigator.userAgent;"),
-        "Referer": APPOINTMENT_URL,
-        "Cookie": "_yatri_session=" + DRIVER.get_cookie("_yatri_session")["value"],
-        "Content-Type": "application/x-www-form-urlencoded",
-    }
+    Args:
+        data (dict): The form fields, from build_reschedule_data().
+        headers (dict): The request headers, with the session cookie.
 
-    data = {
-        "authenticity_token": DRIVER.find_element(
-            by=By.NAME,
-            value="authenticity_token",
-        ).get_attribute("value"),
-        "confirmed_limit_message": DRIVER.find_element(
-            by=By.NAME,
-            value="confirmed_limit_message",
-        ).get_attribute("value"),
-        "use_consulate_appointment_capacity": DRIVER.find_element(
-            by=By.NAME,
-            value="use_consulate_appointment_capacity",
-        ).get_attribute("value"),
-        "appointments[consulate_appointment][facility_id]": FACILITY_ID,
-        "appointments[consulate_appointment][date]": date,
-        "appointments[consulate_appointment][time]": time,
-        "appointments[asc_appointment][facility_id]": CAS_FACILITY_ID,
-        "appointments[asc_appointment][date]": cas_date,
-        "appointments[asc_appointment][time]": cas_time,
-    }
+    Returns:
+        bool: True if the answer confirms the new appointment.
 
+    """
     data_converted_to_urlencoded = urlencode(data, doseq=True)
 
     log_message = (
@@ -528,123 +1255,115 @@ def reschedule(date: str) -> bool:
         data=data_converted_to_urlencoded,
         timeout=TIMEOUT_REQUEST,
     )
+
     response_log = f"Response Status Code: {r.status_code}\nResponse Content: {r.text}\n\n"
     print(response_log)
     info_logger(response_log)
 
-    # Appointment in in readable date format
-    appointment_readable_date = (
-        datetime.strptime(date, "%Y-%m-%d").strftime("%d de %B de %Y").lstrip("0")
-    )
-
-    # CAS in readable date format
-    cas_readable_date = (
-        datetime.strptime(cas_date, "%Y-%m-%d").strftime("%d de %B de %Y").lstrip("0")
-    )
-
     # Check if the appointment was successfully rescheduled
-    if any(substring in r.text for substring in SUCCESS_PATTERNS):
-        msg = (
-            f"¡Cita reagendada para el {appointment_readable_date} a las {time} y "
-            f"cita CAS para el {cas_readable_date} a las {cas_time}!"
-        )
-        _handle_notification("SUCCESS", msg)
-        return True
-
-    # If the appointment was not successfully rescheduled, log the error message
-    _handle_notification(
-        "EXCEPTION",
-        f"No se pudo reagendar la cita para la fecha {appointment_readable_date} a las {time}",
-    )
-    return False
+    return any(substring in r.text for substring in SUCCESS_PATTERNS)
 
 
-def get_consulate_appointment_date() -> dict | bool:
+@metrics.timed("get_consulate_appointment_date")
+def get_consulate_appointment_date(facility: Facility = FACILITIES[0]) -> DatesUpdate | bool:
     """Retrieve the available dates for consulate appointments.
 
+    Args:
+        facility (Facility, optional): The facility to check. Defaults to the first.
+
     Returns:
-        dict | bool: A dictionary containing the available dates or False if an error occurs.
+        DatesUpdate | bool: The available dates and the changes since the previous check, or
+            False if an error occurs.
 
     """
     try:
-        # Requesting to get the whole available dates
-        session = DRIVER.get_cookie("_yatri_session")["value"]
-        script = JS_SCRIPT % (str(DATE_URL), session)
-        content = DRIVER.execute_script(script)
-        return json.loads(content)
+        # Requesting to get the whole available dates. Decoded only if the answer changed
+        return AVAILABLE_DATES[facility].update(fetch_raw(FACILITY_URLS[facility].days))
 
+    except SessionExpiredError:
+        raise
     except Exception as e:
         print(e)
         return False
 
 
-def get_consulate_appointment_time(date_visa: str) -> str | bool:
-    """Attempt to retrieve the consulate appointment time for a given date.
+@metrics.timed("get_consulate_appointment_time")
+def get_consulate_appointment_times(
+    date_visa: str,
+    facility: Facility = FACILITIES[0],
+) -> list[str]:
+    """Attempt to retrieve the acceptable consulate appointment times for a given date.
 
     Args:
-        date_visa (str): The date for which to retrieve the appointment time.
+        date_visa (str): The date for which to retrieve the appointment times.
+        facility (Facility, optional): The facility of the date. Defaults to the first.
 
     Returns:
-        str | bool: The closest available time to the desired time if successful, False otherwise.
-
-    """
-    for attempt in range(1, REQUEST_ATTEMPTS + 1):
-        try:
-            print(f"Attempt {attempt} of {REQUEST_ATTEMPTS} to get time")
-            time_url = TIME_URL % date_visa
-            session = DRIVER.get_cookie("_yatri_session")["value"]
-            script = JS_SCRIPT % (str(time_url), session)
-            content = DRIVER.execute_script(script)
-            data = json.loads(content)
-            available_times = data.get("available_times")
-            print("Available Times:", ", ".join(available_times))
-            time_available = closest_time_to_desired_time(available_times)
-            print(f"Got date and time successfully! {date_visa} - {time_available}")
-            return time_available
-
-        except Exception as e:
-            msg = f"Error to get time in {date_visa} in method get_time(). Error: {e}"
-            print(msg)
-            info_logger(msg)
+        list[str]: The acceptable times, best ranked first. Empty if the date has no times or
+            the request failed.
 
-        print("Retrying...")
-        time.sleep(STEP_TIME)
-
-    return False
+    Raises:
+        NoAcceptableTimeError: If the date has times but none of them is acceptable.
 
+    """
+    time_url = FACILITY_URLS[facility].times % date_visa
+
+    def attempt() -> list[str]:
+        available_times = fetch_json(time_url).get("available_times") or []
+        print("Available Times:", ", ".join(available_times))
+        slot = Slot(date_visa, facility=facility.consulate_id)
+        ranked_times = SETTINGS.slot_ranker.rank_options(slot, "time", available_times)
+        if available_times and not ranked_times:
+            msg = (
+                f"No available time in {date_visa} between {SETTINGS.earliest_time} and "
+                f"{SETTINGS.latest_time}"
+            )
+            raise NoAcceptableTimeError(msg)
+        if ranked_times:
+            print(f"Got date and time successfully! {date_visa} - {ranked_times[0]}")
+        return ranked_times
 
-def _is_in_period(date: str, priod_start_date_obj: datetime, priod_end_date_obj: datetime) -> bool:
-    new_date = datetime.strptime(date, "%Y-%m-%d")
-    return new_date <= priod_end_date_obj and new_date >= priod_start_date_obj
+    try:
+        return RETRIERS["consulate_time"].call(attempt)
+    except (SessionExpiredError, NoAcceptableTimeError):
+        raise
+    except Exception as e:
+        msg = f"Error to get time in {date_visa} in method get_time(). Error: {e}"
+        print(msg)
+        info_logger(msg)
+        return []
 
 
-def get_available_date(dates: list) -> str | None:
-    """Evaluate different available dates and return the first date within the specified period.
+def get_available_slot(dates: dict[Facility, list[str]]) -> Slot | None:
+    """Evaluate the available dates of every facility and return the best ranked one.
 
     Args:
-        dates (list): A list of dictionaries containing date information.
+        dates (dict[Facility, list[str]]): Sorted dates in ISO format (YYYY-MM-DD) by facility.
 
     Returns:
-        str | None: The first available date within the period, or None if no date is found.
+        Slot | None: The best date within the period and its facility, or None if there is none.
 
     """
-    priod_start_date_obj = datetime.strptime(PRIOD_START, "%Y-%m-%d")
-    priod_end_date_obj = datetime.strptime(PRIOD_END, "%Y-%m-%d")
-    for d in dates:
-        date = d.get("date")
-        if _is_in_period(date, priod_start_date_obj, priod_end_date_obj):
-            print(f"Date found: {date}")
-            return date
-    print(
-        f"\n\nNo available dates between ({priod_start_date_obj.date()}) and "
-        f"({priod_end_date_obj.date()})!",
+    ranked = SETTINGS.slot_ranker.rank(
+        [
+            Slot(date, facility=facility.consulate_id)
+            for facility, facility_dates in dates.items()
+            for date in SETTINGS.date_window.matches(facility_dates)
+        ],
     )
-    return None
+    if not ranked:
+        print(f"\n\nNo available dates to try in {SETTINGS.date_window}!")
+        return None
+    print(f"Date found: {ranked[0].date} (facility {ranked[0].facility})")
+    return ranked[0]
 
 
 def info_logger(log_msg: str) -> None:
     """Log information to logging file with timestamp.
 
+    The message is queued for LOG_WRITER, which writes it as a JSON line with wall clock and
+    monotonic timestamps from a background thread.
+
     Args:
         log_msg (str): The message to be logged.
 
@@ -652,52 +1371,228 @@ def info_logger(log_msg: str) -> None:
         None
 
     """
-    with Path(LOG_FILE_NAME).open("a") as file:
-        file.write(str(datetime.now().time()) + ":\n" + log_msg + "\n")
+    LOG_WRITER.log(log_msg)
 
 
-def setup_chrome_driver() -> webdriver.Chrome | webdriver.Remote | None:
-    """Set up the Chrome driver.
+@functools.cache
+def chromedriver_path() -> str:
+    """Return the chromedriver executable, resolved once per run (and cached on disk).
 
     Returns:
-        webdriver.Chrome | webdriver.Remote | None: The Chrome driver instance or None if an error.
+        str: The path of chromedriver.
 
     """
-    driver = None
-    try:
-        if LOCAL_USE:
-            options = webdriver.ChromeOptions()
-
-            # To avoid Tensorflow warnings: https://stackoverflow.com/questions/78385667/why-do-i-keep-getting-this-tensorflow-related-message-in-selenium-errors
-            options.add_argument("--log-level=1")
-            driver = webdriver.Chrome(
-                service=Service(ChromeDriverManager().install()),
-                options=options,
-            )
-            """ # noqa: ERA001
-            In case the previous line fails, use the following line to specify the path to the
-            chromedriver executable.
-            driver = webdriver.Chrome(
-                service=Service(executable_path="~/path/to/your/chromedriver"),
-                options=options,
-            )
-            """
-        elif HUB_ADDRESS:
-            driver = webdriver.Remote(
-                command_executor=HUB_ADDRESS,
-                options=webdriver.ChromeOptions(),
+    if CHROMEDRIVER_PATH:
+        return CHROMEDRIVER_PATH
+    from webdriver_manager.chrome import ChromeDriverManager  # noqa: PLC0415
+
+    return resolve_chromedriver(CHROMEDRIVER_CACHE_FILE, ChromeDriverManager().install)
+
+
+def chrome_options() -> "webdriver.ChromeOptions":
+    """Build the Chrome options: headless if configured and without the unused features.
+
+    Returns:
+        webdriver.ChromeOptions: The options.
+
+    """
+    from selenium import webdriver  # noqa: PLC0415
+
+    options = webdriver.ChromeOptions()
+    # To avoid Tensorflow warnings: https://stackoverflow.com/questions/78385667/why-do-i-keep-getting-this-tensorflow-related-message-in-selenium-errors
+    options.add_argument("--log-level=1")
+    if HEADLESS:
+        options.add_argument("--headless=new")
+        options.add_argument("--window-size=1280,900")
+    for argument in (
+        "--no-first-run",
+        "--no-default-browser-check",
+        "--disable-background-networking",
+        "--disable-sync",
+        "--disable-translate",
+        "--mute-audio",
+    ):
+        options.add_argument(argument)
+    if LOW_FOOTPRINT:
+        for argument in (
+            "--disable-gpu",
+            "--disable-extensions",
+            "--disable-dev-shm-usage",
+        ):
+            options.add_argument(argument)
+        if "images" in BLOCK_RESOURCES:
+            # Also honoured by a remote browser, which has no CDP to block the other resources
+            options.add_experimental_option(
+                "prefs",
+                {"profile.managed_default_content_settings.images": 2},
             )
+    return options
+
+
+def block_resources(driver: "webdriver.Chrome | webdriver.Remote") -> None:
+    """Stop the browser from downloading the BLOCK_RESOURCES (only local Chrome supports it).
+
+    Args:
+        driver (webdriver.Chrome | webdriver.Remote): The new driver.
 
+    """
+    patterns = [p for name in BLOCK_RESOURCES for p in BLOCKED_URL_PATTERNS.get(name, [])]
+    if not patterns or not hasattr(driver, "execute_cdp_cmd"):
+        return
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
     except Exception as e:
-        # Exception Occurred
-        msg = f"Exception in webdriver.Chrome!\n{e}"
+        print(f"Could not block the browser resources: {e}")
+
+
+def launch_local_chrome() -> "webdriver.Chrome":
+    """Launch a local browser, resolving chromedriver again once if Chrome rejects it.
+
+    A chromedriver path cached by a previous run stops matching Chrome when it updates itself.
+
+    Returns:
+        webdriver.Chrome: The driver.
+
+    """
+    from selenium import webdriver  # noqa: PLC0415
+    from selenium.webdriver.chrome.service import Service  # noqa: PLC0415
+
+    try:
+        return webdriver.Chrome(service=Service(chromedriver_path()), options=chrome_options())
+    except SessionNotCreatedException as e:
+        if CHROMEDRIVER_PATH:
+            raise
+        msg = f"Chrome rejected chromedriver, resolving it again. Error: {e.msg}"
         print(msg)
         info_logger(msg)
-        str_to_google_voice("Falló la carga del Web Driver de Google Chrome")
-        send_notification("EXCEPTION", msg)
+    Path(CHROMEDRIVER_CACHE_FILE).unlink(missing_ok=True)
+    chromedriver_path.cache_clear()
+    return webdriver.Chrome(service=Service(chromedriver_path()), options=chrome_options())
+
+
+def create_chrome_driver() -> "webdriver.Chrome | webdriver.Remote":
+    """Launch a new browser, local or in the Selenium hub.
+
+    Returns:
+        webdriver.Chrome | webdriver.Remote: The driver.
+
+    Raises:
+        ValueError: If LOCAL_USE is False and there is no HUB_ADDRESS.
 
+    """
+    from selenium import webdriver  # noqa: PLC0415
+
+    if LOCAL_USE:
+        driver = launch_local_chrome()
+    elif HUB_ADDRESS:
+        driver = webdriver.Remote(command_executor=HUB_ADDRESS, options=chrome_options())
     else:
-        return driver
+        msg = "HUB_ADDRESS is mandatory when LOCAL_USE = False"
+        raise ValueError(msg)
+    if LOW_FOOTPRINT:
+        block_resources(driver)
+    return driver
+
+
+def _report_driver_error(e: Exception) -> None:
+    msg = f"Exception in webdriver.Chrome!\n{e}"
+    print(msg)
+    info_logger(msg)
+    send_notification("EXCEPTION", msg)
+    str_to_google_voice(MSG_DRIVER_ERROR)
+
+
+def setup_chrome_driver() -> "webdriver.Chrome | webdriver.Remote | None":
+    """Set up the Chrome driver, and the warm standby one in the background.
+
+    Returns:
+        webdriver.Chrome | webdriver.Remote | None: The Chrome driver instance or None if an error.
+
+    """
+    try:
+        return DRIVER_MANAGER.start()
+    except Exception as e:
+        _report_driver_error(e)
+        return None
+
+
+def recover_driver() -> bool:
+    """Replace a crashed browser with the standby one (or a new one).
+
+    Returns:
+        bool: True if DRIVER is usable again.
+
+    """
+    global DRIVER  # noqa: PLW0603
+
+    msg = "The browser stopped responding. Switching to the standby browser."
+    print(msg)
+    info_logger(msg)
+    try:
+        DRIVER = DRIVER_MANAGER.replace()
+    except Exception as e:
+        DRIVER = None
+        _report_driver_error(e)
+        return False
+    return True
+
+
+def recycle_browser_if_needed() -> bool:
+    """Log the browser memory and CPU and replace it if it uses more than BROWSER_MAX_MEMORY.
+
+    It only measures every RESOURCE_CHECK_INTERVAL seconds. The session cookies are saved
+    first, so the new browser resumes the session instead of logging in.
+
+    Returns:
+        bool: True if the browser was replaced (the session has to be opened again).
+
+    """
+    global DRIVER, LAST_RESOURCE_CHECK  # noqa: PLW0603
+
+    now = time.monotonic()
+    if now - LAST_RESOURCE_CHECK < SETTINGS.resource_check_interval:
+        return False
+    LAST_RESOURCE_CHECK = now
+    usage = DRIVER_MANAGER.usage()
+    if usage is None:
+        return False
+
+    msg = (
+        f"Browser resources: {usage['rss_mb']:.0f} MB in {usage['processes']} processes, "
+        f"CPU {usage['cpu_percent']:.1f}%"
+    )
+    print(msg)
+    info_logger(msg)
+    if not SETTINGS.browser_max_memory or usage["rss_mb"] <= SETTINGS.browser_max_memory:
+        return False
+
+    msg = f"The browser uses more than {SETTINGS.browser_max_memory:.0f} MB. Replacing it."
+    print(msg)
+    info_logger(msg)
+    save_session()
+    try:
+        DRIVER = DRIVER_MANAGER.replace()
+    except Exception as e:
+        DRIVER = None
+        _report_driver_error(e)
+    return True
+
+
+def open_session() -> bool:
+    """Resume the session or log in, replacing the browser once if it crashed.
+
+    Returns:
+        bool: True if the bot is logged in.
+
+    """
+    if DRIVER is None:
+        return False
+    if resume_session() or start_login_process():
+        return True
+    if is_alive(DRIVER) or not recover_driver():
+        return False
+    return resume_session() or start_login_process()
 
 
 def start_visa_process() -> None:
@@ -706,13 +1601,13 @@ def start_visa_process() -> None:
     total_time, req_count = 0, 0
 
     while True:
+        apply_config_reload()
         if first_loop:
-            if DRIVER is None:
-                break
             t0 = time.time()
             total_time = 0
             req_count = 0
-            if not start_login_process():
+            empty_checks = 0
+            if not open_session():
                 break
             first_loop = False
 
@@ -720,29 +1615,130 @@ def start_visa_process() -> None:
         try:
             log_request_status(req_count)
 
-            dates = get_consulate_appointment_date()
-            if not dates:
+            # One facility per check, in turns, so the requests of the session are evenly spaced
+            facility = FACILITIES[(req_count - 1) % len(FACILITIES)]
+            booked, has_dates = check_and_book(facility)
+            if booked:
+                break
+            empty_checks = 0 if has_dates else empty_checks + 1
+            # An account ban empties the answers of every facility
+            if empty_checks >= len(FACILITIES):
                 handle_ban_situation()
                 first_loop = True
                 continue
 
-            log_available_dates(dates)
-            date = get_available_date(dates)
-            if date and reschedule(date):
-                break
-
             total_time = time.time() - t0
-            if handle_break_time(total_time, req_count):
+            if handle_break_time(total_time, req_count) or recycle_browser_if_needed():
                 first_loop = True
                 continue
 
             handle_retry_wait()
 
+        except SessionExpiredError as e:
+            msg = f"{e}. Logging in again with the browser.\n"
+            print(msg)
+            info_logger(msg)
+            first_loop = True
         except Exception as e:
+            if not is_alive(DRIVER) and recover_driver():
+                first_loop = True
+                continue
             handle_exception(e)
             break
 
 
+def check_facility(facility: Facility) -> tuple[DatesUpdate | bool, float]:
+    """Check the available dates of one facility and measure how long it took.
+
+    Args:
+        facility (Facility): The facility.
+
+    Returns:
+        tuple[DatesUpdate | bool, float]: The result of the check and its duration in seconds.
+
+    """
+    poll_start = time.perf_counter()
+    update = get_consulate_appointment_date(facility)
+    return update, time.perf_counter() - poll_start
+
+
+def check_and_book(facility: Facility) -> tuple[bool, bool]:
+    """Check the available dates of a facility and reschedule to the best date, if any.
+
+    Args:
+        facility (Facility): The facility to check.
+
+    Returns:
+        tuple[bool, bool]: Whether the appointment was rescheduled and whether the facility
+            answered with dates.
+
+    """
+    update, latency = check_facility(facility)
+    has_dates = bool(update and update.dates)
+    log_available_dates(facility, update)
+    booked = has_dates and book_new_date()
+    # Stored once the booking attempt is over, so no disk write delays it
+    record_poll(facility, update, latency)
+    return booked, has_dates
+
+
+def book_new_date() -> bool:
+    """Reschedule the appointment to the best date within the period not tried yet, if any.
+
+    The dates of every facility are compared, as seen in the last check of each one.
+
+    Returns:
+        bool: True if the appointment was rescheduled.
+
+    """
+    # Every available date not tried yet is a candidate, not only the ones that just appeared
+    untried = {facility: dates.untried() for facility, dates in AVAILABLE_DATES.items()}
+    slot = get_available_slot(untried)
+    if slot is None:
+        return False
+    facility = FACILITY_BY_ID[slot.facility]
+    dates = AVAILABLE_DATES[facility]
+    dates.mark_tried(slot.date)
+    booked = skipped = False
+    try:
+        booked = reschedule(slot.date, facility)
+    except NoAcceptableTimeError as e:
+        # Filtered out by the preferences: not offered again while it stays available
+        skipped = True
+        print(e)
+        info_logger(str(e))
+    finally:
+        # Any other failure, including an error raised to the main loop (expired session,
+        # timeout, browser crash): try it again in the next check if it is still available
+        if not booked and not skipped:
+            dates.forget(slot.date)
+    return booked
+
+
+def record_poll(
+    facility: Facility,
+    update: DatesUpdate | bool,  # noqa: FBT001
+    latency: float,
+) -> None:
+    """Store an availability check in the slot history and pass it to the polling scheduler.
+
+    Args:
+        facility (Facility): The facility checked.
+        update (DatesUpdate | bool): The available dates, or False if the request failed.
+        latency (float): Duration of the check in seconds.
+
+    """
+    date_list = None if update is False else update.dates
+    try:
+        outcome, _ = HISTORY.record_poll(str(facility.consulate_id), date_list)
+    except sqlite3.Error as e:
+        msg = f"Failed to store the check in {HISTORY_DB}: {e}"
+        print(msg)
+        info_logger(msg)
+        outcome = "error" if date_list is None else "dates"
+    SCHEDULER.record_poll(latency, outcome)
+
+
 def log_request_status(req_count: int) -> None:
     """Log the request count and timestamp.
 
@@ -755,24 +1751,46 @@ def log_request_status(req_count: int) -> None:
     info_logger(msg)
 
 
+def end_session() -> None:
+    """Sign out before a long wait, unless the session is kept to be resumed afterwards."""
+    if KEEP_SESSION:
+        return
+    DRIVER.get(SIGN_OUT_LINK)
+
+
 def handle_ban_situation() -> None:
     """Handle ban scenario by logging out and waiting for cooldown time."""
-    msg = f"List is empty, Probably banned!\n\tSleep for {BAN_COOLDOWN_TIME} hours!\n"
+    msg = f"List is empty, Probably banned!\n\tSleep for {SETTINGS.ban_cooldown_time} hours!\n"
     print(msg)
     info_logger(msg)
     send_notification("BAN", msg)
-    DRIVER.get(SIGN_OUT_LINK)
-    time.sleep(BAN_COOLDOWN_TIME * HOUR)
+    end_session()
+    time.sleep(SETTINGS.ban_cooldown_time * HOUR)
 
 
-def log_available_dates(dates: list) -> None:
-    """Log available appointment dates.
+def log_available_dates(facility: Facility, update: DatesUpdate | bool) -> None:  # noqa: FBT001
+    """Log the changes of the available appointment dates of a facility since its last check.
 
     Args:
-        dates (list): A list of dictionaries containing date information.
+        facility (Facility): The facility checked.
+        update (DatesUpdate | bool): The result of the check, False if it failed.
 
     """
-    msg = "Available dates:\n" + ", ".join(d.get("date") for d in dates)
+    label = "Available dates"
+    if len(FACILITIES) > 1:
+        label += f" in facility {facility.consulate_id}"
+    if not update:
+        msg = f"{label}: check failed"
+    elif not update.dates:
+        msg = f"{label}: empty list"
+    elif not update.added and not update.removed:
+        msg = f"{label} unchanged ({len(update.dates)})"
+    else:
+        msg = f"{label} ({len(update.dates)}):"
+        if update.added:
+            msg += "\n+ " + ", ".join(update.added)
+        if update.removed:
+            msg += "\n- " + ", ".join(update.removed)
     print(msg)
     info_logger(msg)
 
@@ -783,36 +1801,105 @@ def handle_break_time(total_time: float, req_count: int) -> bool:
     print(msg)
     info_logger(msg)
 
-    if total_time > WORK_LIMIT_TIME * HOUR:
-        msg = f"Break-time after {WORK_LIMIT_TIME} hours | Repeated {req_count} times"
+    if total_time > SETTINGS.work_limit_time * HOUR:
+        msg = f"Break-time after {SETTINGS.work_limit_time} hours | Repeated {req_count} times"
         print(msg)
         info_logger(msg)
         send_notification("REST", msg)
-        DRIVER.get(SIGN_OUT_LINK)
-        time.sleep(WORK_COOLDOWN_TIME * HOUR)
+        end_session()
+        time.sleep(SETTINGS.work_cooldown_time * HOUR)
         return True  # Restart process after cooldown
     return False
 
 
 def handle_retry_wait() -> None:
-    """Wait a random retry time before the next attempt."""
-    retry_wait_time = random.randint(RETRY_TIME_L_BOUND, RETRY_TIME_U_BOUND)  # noqa: S311
-    msg = f"Retry Wait Time: {retry_wait_time} seconds"
+    """Wait the retry time chosen by the polling scheduler before the next attempt.
+
+    The wait is shared by the facilities, which are checked in turns.
+    """
+    retry_wait_time = SCHEDULER.next_interval(polls_per_round=len(FACILITIES))
+    msg = f"Retry Wait Time: {retry_wait_time:.1f} seconds"
     print(msg)
     info_logger(msg)
     time.sleep(retry_wait_time)
 
 
+def request_reload(_signum: int, _frame: object) -> None:
+    """Ask for the configuration to be reloaded before the next check (SIGHUP handler)."""
+    global RELOAD_REQUESTED  # noqa: PLW0603
+
+    RELOAD_REQUESTED = True
+
+
+def apply_config_reload() -> None:
+    """If SIGHUP was received, read CONFIG_FILE again and apply the options that can change.
+
+    The browser and the session are kept. If the file is invalid the error is logged and the
+    current settings remain in use.
+    """
+    global SETTINGS, RELOAD_REQUESTED, NOTIFIER  # noqa: PLW0603
+
+    if not RELOAD_REQUESTED:
+        return
+    RELOAD_REQUESTED = False
+    try:
+        settings, pending = reload_settings(SETTINGS, CONFIG_FILE)
+    except Exception as e:
+        # Whatever the edit, a running session is never stopped by a reload
+        msg = f"The configuration was not reloaded: {e}"
+        print(msg)
+        info_logger(msg)
+        return
+
+    # Dates already seen are offered again if the window or the preferences changed
+    if (settings.date_window, settings.slot_ranker) != (SETTINGS.date_window, SETTINGS.slot_ranker):
+        for facility in AVAILABLE_DATES:
+            AVAILABLE_DATES[facility] = AvailableDates()
+    # The channels are set up again with the new credentials at the next notification
+    channel_options = operator.attrgetter(*NOTIFICATION_OPTIONS)
+    if NOTIFIER is not None and channel_options(settings) != channel_options(SETTINGS):
+        NOTIFIER.shutdown()
+        NOTIFIER = None
+    SCHEDULER.min_interval = settings.retry_time_l_bound
+    SCHEDULER.max_interval = settings.retry_time_u_bound
+    SCHEDULER.max_requests_per_hour = settings.max_requests_per_hour
+    SETTINGS = settings
+
+    msg = "Configuration reloaded"
+    if pending:
+        msg += f". Restart the bot to apply: {', '.join(pending)}"
+    print(msg)
+    info_logger(msg)
+
+
 def handle_exception(e: Exception) -> None:
     """Log and handles exceptions by breaking the loop."""
     msg = f"Break the loop after exception!\n{e}"
     print(msg)
     info_logger(msg)
-    str_to_google_voice("Falló la ejecución")
+    str_to_google_voice(MSG_EXECUTION_ERROR)
 
 
 if __name__ == "__main__":
     set_spanish_locale()
+    if hasattr(signal, "SIGHUP"):  # Not available on Windows
+        signal.signal(signal.SIGHUP, request_reload)
+    if VOICE_WARM_UP:
+        VOICE_CACHE.warm_up(STATIC_VOICE_MESSAGES)
+    metrics.start_exporter(METRICS_FILE, METRICS_INTERVAL, METRICS_PORT)
+    since = time.time() - RELEASE_HISTORY_DAYS * 24 * HOUR
+    SCHEDULER.release_hours = [
+        sum(counts)
+        for counts in zip(
+            *(HISTORY.release_hours(str(f.consulate_id), since=since) for f in FACILITIES),
+            strict=True,
+        )
+    ]
     DRIVER = setup_chrome_driver()
     if DRIVER is not None:
         start_visa_process()
+    DRIVER_MANAGER.shutdown()
+    # Let the last notifications (success or failure) be delivered and spoken before exiting
+    if NOTIFIER is not None:
+        NOTIFIER.shutdown()
+    AUDIO_PLAYER.wait(AUDIO_EXIT_TIMEOUT)
@@ -0,0 +1,212 @@
+"""Spoken alerts: content-addressed cache of Google Text-to-Speech clips and audio player.
+
+Each clip is stored as {cache_dir}/{sha256(lang, tld, text)}.mp3, so a message is only
+synthesized the first time it is spoken. The cache is bounded in size and evicts the least
+recently played clips first.
+
+AudioPlayer plays the messages one after another from its own thread, so the caller never waits
+for the audio.
+
+gTTS is only imported when a clip has to be synthesized, so cached alerts (and runs without
+alerts) do not pay for loading it.
+"""
+
+import hashlib
+import queue
+import threading
+from collections.abc import Callable, Iterable
+from pathlib import Path
+
+# Seconds to wait for the Google Text-to-Speech service
+TTS_TIMEOUT = 10
+
+
+class VoiceCache:
+    """Size-bounded LRU cache of spoken messages on disk."""
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_bytes: int,
+        lang: str = "es",
+        tld: str = "com.mx",
+    ) -> None:
+        """Create the cache. The directory is created with the first clip.
+
+        Args:
+            cache_dir (str): Directory of the cached clips.
+            max_bytes (int): Maximum total size of the clips.
+            lang (str): Language of the voice.
+            tld (str): Google top level domain, which sets the accent of the voice.
+
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.lang = lang
+        self.tld = tld
+        self._lock = threading.Lock()
+
+    def path_for(self, message: str) -> Path:
+        """Return the path of the clip of a message, cached or not.
+
+        Args:
+            message (str): Text of the message.
+
+        Returns:
+            Path: The clip path.
+
+        """
+        key = hashlib.sha256(f"{self.lang}\0{self.tld}\0{message}".encode()).hexdigest()
+        return self.cache_dir / f"{key}.mp3"
+
+    def get(self, message: str) -> Path:
+        """Return the clip of a message, synthesizing it if it is not cached.
+
+        Args:
+            message (str): Text of the message.
+
+        Returns:
+            Path: The clip path.
+
+        Raises:
+            Exception: Any error of the Text-to-Speech service if the clip is not cached.
+
+        """
+        path = self.path_for(message)
+        if path.exists():
+            # The modification time is the "last played" mark of the LRU eviction
+            path.touch()
+            return path
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.stem}.{threading.get_ident()}.tmp")
+        from gtts import gTTS  # noqa: PLC0415  # To Google voice
+
+        tts = gTTS(text=message, lang=self.lang, tld=self.tld, slow=False, timeout=TTS_TIMEOUT)
+        try:
+            tts.save(str(tmp_path))
+        except Exception:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        tmp_path.replace(path)
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep: Path | None = None) -> None:
+        """Delete the least recently played clips until the cache fits in max_bytes.
+
+        Args:
+            keep (Path | None): A clip never deleted, e.g. the one about to be played, even if
+                it alone exceeds max_bytes.
+
+        """
+        with self._lock:
+            clips = []
+            for clip in self.cache_dir.glob("*.mp3"):
+                try:
+                    stat = clip.stat()
+                except FileNotFoundError:
+                    continue
+                clips.append((stat.st_mtime, stat.st_size, clip))
+
+            total = sum(size for _, size, _ in clips)
+            for _, size, clip in sorted(clips):
+                if total <= self.max_bytes:
+                    break
+                if clip == keep:
+                    continue
+                clip.unlink(missing_ok=True)
+                total -= size
+
+    def warm_up(self, messages: Iterable[str]) -> threading.Thread:
+        """Synthesize the clips of the given messages in a background thread.
+
+        Args:
+            messages (Iterable[str]): Messages to have ready before they are needed.
+
+        Returns:
+            threading.Thread: The started thread.
+
+        """
+
+        def render() -> None:
+            for message in messages:
+                try:
+                    self.get(message)
+                except Exception as e:
+                    print(f"Voice cache warm-up failed for '{message}': {e}")
+                    return
+
+        thread = threading.Thread(target=render, name="voice-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+
+class AudioPlayer:
+    """Play spoken messages from a background queue, collapsing duplicates."""
+
+    def __init__(
+        self,
+        cache: VoiceCache,
+        play: Callable[[str], None],
+        on_error: Callable[[str, Exception], None] | None = None,
+    ) -> None:
+        """Create the player. Its thread starts with the first message.
+
+        Args:
+            cache (VoiceCache): Source of the audio clips.
+            play (Callable): Function playing an audio file until it ends.
+            on_error (Callable | None): Called with the message and the error when a message
+                cannot be synthesized or played.
+
+        """
+        self.cache = cache
+        self.play = play
+        self.on_error = on_error
+        self._queue = queue.Queue()
+        # Messages queued or playing. A message already here is not queued again
+        self._pending = set()
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def say(self, message: str) -> None:
+        """Queue a message and return immediately.
+
+        Args:
+            message (str): Text to speak.
+
+        """
+        with self._condition:
+            if message in self._pending:
+                return
+            self._pending.add(message)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="audio", daemon=True)
+                self._thread.start()
+        self._queue.put(message)
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Wait until every queued message has been played.
+
+        Args:
+            timeout (float | None): Maximum seconds to wait.
+
+        Returns:
+            bool: True if the queue is empty, False if the timeout expired first.
+
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending, timeout)
+
+    def _run(self) -> None:
+        while True:
+            message = self._queue.get()
+            try:
+                self.play(str(self.cache.get(message)))
+            except Exception as e:
+                if self.on_error is not None:
+                    self.on_error(message, e)
+            finally:
+                with self._condition:
+                    self._pending.discard(message)
+                    self._condition.notify_all()